@@ -18,11 +18,23 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from database import Base  # noqa: E402
+from database import Base, DATABASE_URL  # noqa: E402
 import models  # noqa: F401, E402 — registers all models with Base
 
 target_metadata = Base.metadata
 
+# Migrate the same database the app uses (DATABASE_URL overrides alembic.ini)
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """Keep autogenerate away from the FTS5 virtual/shadow tables (see search_index.py)."""
+    if type_ == "table":
+        return "_fts" not in (name or "")
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -45,6 +57,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -68,7 +81,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_name=include_name
         )
 
         with context.begin_transaction():
@@ -0,0 +1,36 @@
+"""Add agent_context_summaries for budgeted chat history
+
+Revision ID: a0b1c2d3e4f5
+Revises: f9a0b1c2d3e4
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'a0b1c2d3e4f5'
+down_revision: Union[str, Sequence[str], None] = 'f9a0b1c2d3e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    if 'agent_context_summaries' not in inspect(conn).get_table_names():
+        op.create_table(
+            'agent_context_summaries',
+            sa.Column('project_id', sa.String(), sa.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('agent', sa.String(), nullable=False),
+            sa.Column('summary', sa.Text(), nullable=False, server_default=''),
+            sa.Column('through_seq', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('project_id', 'agent'),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('agent_context_summaries')
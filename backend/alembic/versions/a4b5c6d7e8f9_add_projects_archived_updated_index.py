@@ -0,0 +1,28 @@
+"""Add (archived, updated_at) index to projects
+
+Revision ID: a4b5c6d7e8f9
+Revises: f3a4b5c6d7e8
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'a4b5c6d7e8f9'
+down_revision: Union[str, Sequence[str], None] = 'f3a4b5c6d7e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    if 'ix_projects_archived_updated' not in {ix['name'] for ix in inspect(conn).get_indexes('projects')}:
+        op.create_index('ix_projects_archived_updated', 'projects', ['archived', 'updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_projects_archived_updated', table_name='projects')
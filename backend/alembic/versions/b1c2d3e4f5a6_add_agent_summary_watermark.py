@@ -0,0 +1,29 @@
+"""Add agent_summaries.through_seq for incremental summaries
+
+Revision ID: b1c2d3e4f5a6
+Revises: a0b1c2d3e4f5
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'b1c2d3e4f5a6'
+down_revision: Union[str, Sequence[str], None] = 'a0b1c2d3e4f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    if 'through_seq' not in {c['name'] for c in inspect(conn).get_columns('agent_summaries')}:
+        # NULL for existing rows: their next summary is a full one
+        op.add_column('agent_summaries', sa.Column('through_seq', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('agent_summaries', 'through_seq')
@@ -0,0 +1,72 @@
+"""Move per-agent summary columns into an agent_summaries table
+
+Revision ID: b5c6d7e8f9a0
+Revises: a4b5c6d7e8f9
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'b5c6d7e8f9a0'
+down_revision: Union[str, Sequence[str], None] = 'a4b5c6d7e8f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+AGENTS = ['strategy', 'research', 'concept', 'present']
+FIELDS = ['summary', 'problem_statement', 'assumptions', 'detail_summary']
+
+
+def _columns(conn, table: str) -> set:
+    from sqlalchemy import inspect
+    return {c['name'] for c in inspect(conn).get_columns(table)}
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    from sqlalchemy import inspect
+    if 'agent_summaries' not in inspect(conn).get_table_names():
+        op.create_table(
+            'agent_summaries',
+            sa.Column('project_id', sa.String(), sa.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('agent', sa.String(), nullable=False),
+            sa.Column('summary', sa.Text(), nullable=True),
+            sa.Column('problem_statement', sa.Text(), nullable=True),
+            sa.Column('assumptions', sa.Text(), nullable=True),
+            sa.Column('detail_summary', sa.Text(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('project_id', 'agent'),
+        )
+
+    # Backfill one row per (project, agent) that has any summary field set, then drop the wide columns
+    existing = _columns(conn, 'projects')
+    for agent in AGENTS:
+        cols = [f'{agent}_{field}' for field in FIELDS]
+        if not set(cols) <= existing:
+            continue
+        op.execute(f"""
+            INSERT INTO agent_summaries (project_id, agent, {', '.join(FIELDS)}, updated_at)
+            SELECT id, '{agent}', {', '.join(cols)}, updated_at
+            FROM projects
+            WHERE {' OR '.join(f'{c} IS NOT NULL' for c in cols)}
+        """)
+        for col in cols:
+            op.drop_column('projects', col)
+
+
+def downgrade() -> None:
+    for agent in AGENTS:
+        for field in FIELDS:
+            op.add_column('projects', sa.Column(f'{agent}_{field}', sa.Text(), nullable=True))
+        for field in FIELDS:
+            op.execute(f"""
+                UPDATE projects SET {agent}_{field} = (
+                    SELECT {field} FROM agent_summaries
+                    WHERE agent_summaries.project_id = projects.id AND agent_summaries.agent = '{agent}'
+                )
+            """)
+    op.drop_table('agent_summaries')
@@ -0,0 +1,38 @@
+"""Add summary_chunks cache for map-reduce summaries
+
+Revision ID: c2d3e4f5a6b7
+Revises: b1c2d3e4f5a6
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c2d3e4f5a6b7'
+down_revision: Union[str, Sequence[str], None] = 'b1c2d3e4f5a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    if 'summary_chunks' not in inspect(conn).get_table_names():
+        op.create_table(
+            'summary_chunks',
+            sa.Column('project_id', sa.String(), sa.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('agent', sa.String(), nullable=False),
+            sa.Column('first_seq', sa.Integer(), nullable=False),
+            sa.Column('last_seq', sa.Integer(), nullable=False),
+            sa.Column('digest', sa.String(), nullable=False),
+            sa.Column('notes', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('project_id', 'agent', 'first_seq', 'last_seq'),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('summary_chunks')
@@ -0,0 +1,60 @@
+"""Add FTS5 search indexes over messages, projects, summaries and board items
+
+Revision ID: c6d7e8f9a0b1
+Revises: b5c6d7e8f9a0
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c6d7e8f9a0b1'
+down_revision: Union[str, Sequence[str], None] = 'b5c6d7e8f9a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+FTS_INDEXES = {
+    'chat_messages_fts': ('chat_messages', ('content',)),
+    'projects_fts': ('projects', ('title', 'description')),
+    'agent_summaries_fts': ('agent_summaries', ('summary', 'problem_statement', 'assumptions', 'detail_summary')),
+    'dossi_board_fts': ('dossi_board_items', ('label', 'filename', 'source_url')),
+}
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != 'sqlite':
+        return  # FTS5 is SQLite-only; /api/search reports 501 elsewhere
+
+    for index, (table, columns) in FTS_INDEXES.items():
+        cols = ', '.join(columns)
+        new_vals = ', '.join(f'new.{c}' for c in columns)
+        old_vals = ', '.join(f'old.{c}' for c in columns)
+        insert_new = f"INSERT INTO {index}(rowid, {cols}) VALUES (new.rowid, {new_vals});"
+        delete_old = f"INSERT INTO {index}({index}, rowid, {cols}) VALUES ('delete', old.rowid, {old_vals});"
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+            f"{cols}, content='{table}', content_rowid='rowid', tokenize='porter unicode61')"
+        )
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN {insert_new} END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN {delete_old} END")
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE OF {cols} ON {table} "
+            f"BEGIN {delete_old} {insert_new} END"
+        )
+        # Index rows that already exist
+        op.execute(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != 'sqlite':
+        return
+    for index, (table, _) in FTS_INDEXES.items():
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {index}")
@@ -0,0 +1,32 @@
+"""Add chat_messages.status and error for turns saved before the model replies
+
+Revision ID: d3e4f5a6b7c8
+Revises: c2d3e4f5a6b7
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd3e4f5a6b7c8'
+down_revision: Union[str, Sequence[str], None] = 'c2d3e4f5a6b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    columns = {c['name'] for c in inspect(conn).get_columns('chat_messages')}
+    if 'status' not in columns:
+        op.add_column('chat_messages', sa.Column('status', sa.String(), nullable=False, server_default='complete'))
+    if 'error' not in columns:
+        op.add_column('chat_messages', sa.Column('error', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('chat_messages', 'error')
+    op.drop_column('chat_messages', 'status')
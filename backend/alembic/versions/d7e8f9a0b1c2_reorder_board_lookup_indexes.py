@@ -0,0 +1,48 @@
+"""Lead board lookup indexes with file_path / source_url for cross-project membership
+
+Revision ID: d7e8f9a0b1c2
+Revises: c6d7e8f9a0b1
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd7e8f9a0b1c2'
+down_revision: Union[str, Sequence[str], None] = 'c6d7e8f9a0b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# old name -> (new name, new column order); both serve (project_id, x) equality lookups,
+# only the new order also serves lookups by x alone.
+#
+# e2f3a4b5c6d7 now creates the new indexes itself, so this only rewrites
+# databases that ran its earlier version; everywhere else it is a no-op.
+REPLACEMENTS = {
+    'ix_dossi_board_items_project_source_url': ('ix_dossi_board_items_source_url_project', ['source_url', 'project_id']),
+    'ix_dossi_board_items_project_file_path': ('ix_dossi_board_items_file_path_project', ['file_path', 'project_id']),
+}
+
+
+def _indexes(conn) -> set:
+    from sqlalchemy import inspect
+    return {ix['name'] for ix in inspect(conn).get_indexes('dossi_board_items')}
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    existing = _indexes(conn)
+    for old, (new, cols) in REPLACEMENTS.items():
+        if new not in existing:
+            op.create_index(new, 'dossi_board_items', cols)
+        if old in existing:
+            op.drop_index(old, table_name='dossi_board_items')
+
+
+def downgrade() -> None:
+    # Nothing to undo: the new indexes belong to e2f3a4b5c6d7, which drops them
+    pass
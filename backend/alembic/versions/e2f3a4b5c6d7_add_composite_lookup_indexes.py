@@ -0,0 +1,59 @@
+"""Add composite indexes for chat history and dossi board lookups
+
+Revision ID: e2f3a4b5c6d7
+Revises: d1e2f3a4b5c6
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e2f3a4b5c6d7'
+down_revision: Union[str, Sequence[str], None] = 'd1e2f3a4b5c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_chat_messages_project_agent_created', 'chat_messages', ['project_id', 'agent', 'created_at']),
+    ('ix_dossi_board_items_project_folder_created', 'dossi_board_items', ['project_id', 'folder', 'created_at']),
+    # Led by the looked-up value, not project_id: they serve (project_id, x)
+    # equality and cross-project membership lookups by x alone
+    ('ix_dossi_board_items_source_url_project', 'dossi_board_items', ['source_url', 'project_id']),
+    ('ix_dossi_board_items_file_path_project', 'dossi_board_items', ['file_path', 'project_id']),
+]
+
+# What an earlier version of this revision created; d7e8f9a0b1c2 replaces them
+# on databases that have them
+LEGACY_INDEXES = [
+    ('ix_dossi_board_items_project_source_url', 'dossi_board_items'),
+    ('ix_dossi_board_items_project_file_path', 'dossi_board_items'),
+]
+
+
+def _indexes(conn, table: str) -> set:
+    from sqlalchemy import inspect
+    return {ix['name'] for ix in inspect(conn).get_indexes(table)}
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    for name, table, cols in INDEXES:
+        if name not in _indexes(conn, table):
+            op.create_index(name, table, cols)
+
+    # Superseded by the (project_id, folder, created_at) prefix
+    if 'ix_dossi_board_items_project_id' in _indexes(conn, 'dossi_board_items'):
+        op.drop_index('ix_dossi_board_items_project_id', table_name='dossi_board_items')
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if 'ix_dossi_board_items_project_id' not in _indexes(conn, 'dossi_board_items'):
+        op.create_index('ix_dossi_board_items_project_id', 'dossi_board_items', ['project_id'])
+    for name, table in LEGACY_INDEXES + [(name, table) for name, table, _ in reversed(INDEXES)]:
+        if name in _indexes(conn, table):
+            op.drop_index(name, table_name=table)
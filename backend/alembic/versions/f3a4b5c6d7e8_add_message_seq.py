@@ -0,0 +1,74 @@
+"""Add per-project monotonic seq to chat_messages
+
+Revision ID: f3a4b5c6d7e8
+Revises: e2f3a4b5c6d7
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'f3a4b5c6d7e8'
+down_revision: Union[str, Sequence[str], None] = 'e2f3a4b5c6d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _columns(conn, table: str) -> set:
+    from sqlalchemy import inspect
+    return {c['name'] for c in inspect(conn).get_columns(table)}
+
+
+def _indexes(conn, table: str) -> set:
+    from sqlalchemy import inspect
+    return {ix['name'] for ix in inspect(conn).get_indexes(table)}
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    if 'message_seq' not in _columns(conn, 'projects'):
+        op.add_column('projects', sa.Column('message_seq', sa.Integer(), nullable=False, server_default='0'))
+
+    if 'seq' not in _columns(conn, 'chat_messages'):
+        op.add_column('chat_messages', sa.Column('seq', sa.Integer(), nullable=True))
+
+        # Number existing messages per project in their current (created_at) order
+        op.execute("""
+            UPDATE chat_messages SET seq = numbered.rn
+            FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY project_id ORDER BY created_at, id) AS rn
+                FROM chat_messages
+            ) AS numbered
+            WHERE numbered.id = chat_messages.id
+        """)
+        op.execute("""
+            UPDATE projects SET message_seq = COALESCE(
+                (SELECT MAX(seq) FROM chat_messages WHERE chat_messages.project_id = projects.id), 0
+            )
+        """)
+        # SQLite can't add NOT NULL in place, and a batch table rebuild would drop the
+        # ON DELETE CASCADE clause; the app always sets seq, so leave it nullable there.
+        if conn.dialect.name != 'sqlite':
+            op.alter_column('chat_messages', 'seq', existing_type=sa.Integer(), nullable=False)
+
+    indexes = _indexes(conn, 'chat_messages')
+    if 'ix_chat_messages_project_agent_created' in indexes:
+        op.drop_index('ix_chat_messages_project_agent_created', table_name='chat_messages')
+    if 'uq_chat_messages_project_seq' not in indexes:
+        op.create_index('uq_chat_messages_project_seq', 'chat_messages', ['project_id', 'seq'], unique=True)
+    if 'ix_chat_messages_project_agent_seq' not in indexes:
+        op.create_index('ix_chat_messages_project_agent_seq', 'chat_messages', ['project_id', 'agent', 'seq'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_messages_project_agent_seq', table_name='chat_messages')
+    op.drop_index('uq_chat_messages_project_seq', table_name='chat_messages')
+    op.create_index(
+        'ix_chat_messages_project_agent_created', 'chat_messages', ['project_id', 'agent', 'created_at'],
+    )
+    op.drop_column('chat_messages', 'seq')
+    op.drop_column('projects', 'message_seq')
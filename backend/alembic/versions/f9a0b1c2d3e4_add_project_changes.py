@@ -0,0 +1,41 @@
+"""Add project_changes log behind the per-project change feed
+
+Revision ID: f9a0b1c2d3e4
+Revises: e8f9a0b1c2d3
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'f9a0b1c2d3e4'
+down_revision: Union[str, Sequence[str], None] = 'e8f9a0b1c2d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    if 'project_changes' not in inspect(conn).get_table_names():
+        op.create_table(
+            'project_changes',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('project_id', sa.String(), sa.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('version', sa.Integer(), nullable=False),
+            sa.Column('entity', sa.String(), nullable=False),
+            sa.Column('entity_id', sa.String(), nullable=False),
+            sa.Column('op', sa.String(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        )
+    indexes = {ix['name'] for ix in inspect(conn).get_indexes('project_changes')}
+    if 'ix_project_changes_project_version' not in indexes:
+        op.create_index('ix_project_changes_project_version', 'project_changes', ['project_id', 'version'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_project_changes_project_version', table_name='project_changes')
+    op.drop_table('project_changes')
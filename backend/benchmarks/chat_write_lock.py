@@ -0,0 +1,125 @@
+"""
+Do other writers wait on a chat turn's model call?
+
+Sends concurrent POST /messages turns against a model stub that takes
+--latency seconds to answer, while writer tasks keep renaming other
+projects (PATCH /projects/{id}). send_message commits the user message
+before the model call and the reply after it, so writer latency should
+stay in milliseconds — far below the model latency — with no
+"database is locked" failures. If a turn held its write transaction across
+the call, writers would queue behind it (up to busy_timeout, then fail).
+
+Runs the app in-process on a throwaway SQLite database; no OpenAI key needed.
+
+Usage (from backend/):
+    python -m benchmarks.chat_write_lock [--chats 8] [--writers 4] [--latency 2]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+import httpx  # noqa: E402
+
+import main as app_main  # noqa: E402
+
+
+class _SlowCompletions:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        message = types.SimpleNamespace(content="stub reply")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+class _SlowModel:
+    """Stands in for AsyncOpenAI: every chat completion takes `latency` seconds."""
+
+    def __init__(self, latency: float):
+        self.chat = types.SimpleNamespace(completions=_SlowCompletions(latency))
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run(chats: int, writers: int, latency: float) -> dict:
+    app_main.app.state.openai = _SlowModel(latency)
+    # Count app errors (e.g. "database is locked") as failed requests instead of raising them here
+    transport = httpx.ASGITransport(app=app_main.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench/api", timeout=None) as client:
+        chat_projects = [(await client.post("/projects", json={"title": f"chat {i}"})).json()["id"] for i in range(chats)]
+        writer_projects = [(await client.post("/projects", json={"title": f"writer {i}"})).json()["id"] for i in range(writers)]
+
+        chat_times: list[float] = []
+        write_times: list[float] = []
+        failures = {"chat": 0, "write": 0}
+        done = asyncio.Event()
+
+        async def chat(project_id: str) -> None:
+            start = time.perf_counter()
+            r = await client.post(f"/projects/{project_id}/messages", json={"content": "hello", "agent": "strategy"})
+            chat_times.append(time.perf_counter() - start)
+            if r.status_code != 200:
+                failures["chat"] += 1
+
+        async def writer(project_id: str) -> None:
+            n = 0
+            while not done.is_set():
+                start = time.perf_counter()
+                r = await client.patch(f"/projects/{project_id}", json={"title": f"renamed {n}"})
+                write_times.append(time.perf_counter() - start)
+                if r.status_code != 200:
+                    failures["write"] += 1
+                n += 1
+                await asyncio.sleep(0.01)
+
+        writer_tasks = [asyncio.create_task(writer(pid)) for pid in writer_projects]
+        await asyncio.sleep(0.1)
+        await asyncio.gather(*(chat(pid) for pid in chat_projects))
+        done.set()
+        await asyncio.gather(*writer_tasks)
+
+    return {
+        "chat_median": statistics.median(chat_times),
+        "writes": len(write_times),
+        "write_p50": _percentile(write_times, 0.5),
+        "write_p95": _percentile(write_times, 0.95),
+        "write_max": max(write_times),
+        "failures": failures,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=2.0, help="seconds per model call")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    r = asyncio.run(run(args.chats, args.writers, args.latency))
+    print(f"model latency       {args.latency * 1000:>9.0f} ms")
+    print(f"chat turn (median)  {r['chat_median'] * 1000:>9.0f} ms   failed: {r['failures']['chat']}")
+    print(f"writes during chats {r['writes']:>9}      failed: {r['failures']['write']}")
+    print(f"write p50 / p95 / max  {r['write_p50'] * 1000:.1f} / {r['write_p95'] * 1000:.1f} / {r['write_max'] * 1000:.1f} ms")
+    blocked = r["write_max"] >= args.latency
+    print("writers were blocked behind the model call" if blocked else "writers were not blocked by in-flight turns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Query plans and timings for the hot lookup paths, with and without the
+composite indexes declared in models.py.
+
+Seeds a throwaway SQLite database (default: 1M chat messages spread over
+200 projects and 100k dossi board items), then for each query prints the
+EXPLAIN QUERY PLAN and the median time — first with the composite indexes
+dropped, then with them in place.
+
+Usage (from backend/):
+    python -m benchmarks.index_query_plans [--messages 1000000] [--items 100000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text  # noqa: E402
+
+from database import Base, build_engine  # noqa: E402
+from models import ChatMessage, DossiBoardItem  # noqa: E402
+
+AGENTS = ["strategy", "research", "concept", "present"]
+FOLDERS = ["images", "typefaces", "websites"]
+PROJECTS = 200
+
+QUERIES = {
+    "agent history": (
+        "SELECT * FROM chat_messages WHERE project_id = :pid AND agent = :agent ORDER BY seq",
+        {"agent": "research"},
+    ),
+    "agent history page": (
+        "SELECT * FROM chat_messages WHERE project_id = :pid AND agent = :agent ORDER BY seq DESC LIMIT 50",
+        {"agent": "research"},
+    ),
+    "messages after seq": (
+        "SELECT * FROM chat_messages WHERE project_id = :pid AND seq > :after ORDER BY seq LIMIT 50",
+        {"after": 500},
+    ),
+    "board listing": (
+        "SELECT * FROM dossi_board_items WHERE project_id = :pid AND folder = :folder ORDER BY created_at",
+        {"folder": "websites"},
+    ),
+    "reference dedupe": (
+        "SELECT id FROM dossi_board_items WHERE project_id = :pid AND source_url = :url LIMIT 1",
+        {"url": "https://example.com/page/42"},
+    ),
+    "asset lookup": (
+        "SELECT id FROM dossi_board_items WHERE project_id = :pid AND file_path = :path LIMIT 1",
+        {"path": "asset:/assets/img-42.png"},
+    ),
+}
+
+COMPOSITE_INDEXES = [ix for table in (ChatMessage.__table__, DossiBoardItem.__table__) for ix in table.indexes]
+# The history queries above are only meaningful if these are toggled too
+assert {"ix_chat_messages_project_agent_seq", "uq_chat_messages_project_seq"} <= {ix.name for ix in COMPOSITE_INDEXES}
+
+
+def seed(conn, messages: int, items: int) -> list[str]:
+    project_ids = [str(uuid.uuid4()) for _ in range(PROJECTS)]
+    now = datetime.now(timezone.utc)
+    conn.execute(
+        text("INSERT INTO projects (id, title, archived, thumbnail_index, created_at, updated_at) "
+             "VALUES (:id, 'bench', 0, 0, :ts, :ts)"),
+        [{"id": pid, "ts": now} for pid in project_ids],
+    )
+    batch = 50_000
+    for start in range(0, messages, batch):
+        conn.execute(
+            text("INSERT INTO chat_messages (id, project_id, seq, role, content, agent, created_at) "
+                 "VALUES (:id, :pid, :seq, :role, :content, :agent, :ts)"),
+            [
+                {
+                    "id": uuid.uuid4().hex,
+                    "pid": project_ids[i % PROJECTS],
+                    "seq": i // PROJECTS + 1,  # per-project, in insertion order like _next_message_seq
+                    "role": "user" if i % 2 else "assistant",
+                    "content": "lorem ipsum " * 8,
+                    "agent": AGENTS[(i // PROJECTS) % 4],
+                    "ts": now + timedelta(milliseconds=i),
+                }
+                for i in range(start, min(start + batch, messages))
+            ],
+        )
+    conn.execute(
+        text("INSERT INTO dossi_board_items (id, project_id, folder, file_path, filename, source_url, created_at) "
+             "VALUES (:id, :pid, :folder, :path, 'f', :url, :ts)"),
+        [
+            {
+                "id": uuid.uuid4().hex,
+                "pid": project_ids[i % PROJECTS],
+                "folder": FOLDERS[i % 3],
+                "path": f"asset:/assets/img-{i}.png",
+                "url": f"https://example.com/page/{i}",
+                "ts": now + timedelta(milliseconds=i),
+            }
+            for i in range(items)
+        ],
+    )
+    return project_ids
+
+
+def measure(conn, project_ids: list[str], repeat: int) -> dict[str, tuple[str, float]]:
+    results = {}
+    for name, (sql, params) in QUERIES.items():
+        bound = {**params, "pid": project_ids[PROJECTS // 2]}
+        plan = " | ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), bound))
+        timings = []
+        for i in range(repeat):
+            bound["pid"] = project_ids[i % PROJECTS]
+            t0 = time.perf_counter()
+            conn.execute(text(sql), bound).fetchall()
+            timings.append(time.perf_counter() - t0)
+        results[name] = (plan, statistics.median(timings) * 1000)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        eng = build_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", "sqlite")
+        Base.metadata.create_all(eng)
+        with eng.begin() as conn:
+            for ix in COMPOSITE_INDEXES:
+                ix.drop(conn)
+            print(f"Seeding {args.messages:,} messages and {args.items:,} board items…")
+            project_ids = seed(conn, args.messages, args.items)
+
+        with eng.connect() as conn:
+            conn.execute(text("ANALYZE"))
+            before = measure(conn, project_ids, args.repeat)
+        with eng.begin() as conn:
+            for ix in COMPOSITE_INDEXES:
+                ix.create(conn)
+            conn.execute(text("ANALYZE"))
+        with eng.connect() as conn:
+            after = measure(conn, project_ids, args.repeat)
+        eng.dispose()
+
+    for name in QUERIES:
+        (plan_b, ms_b), (plan_a, ms_a) = before[name], after[name]
+        print(f"\n{name}")
+        print(f"  without indexes  {ms_b:9.2f} ms   {plan_b}")
+        print(f"  with indexes     {ms_a:9.2f} ms   {plan_a}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Does the project-context memo in prompt.py survive chat turns?
+
+Sends --turns consecutive POST /messages turns to one agent against a model
+stub, then an edit to the project description and one more turn. Every
+turn commits messages (bumping Project.version) without touching the
+project context, so only the first turn and the one after the edit
+should miss; the rest must hit. Exits non-zero otherwise.
+
+Runs the app in-process on a throwaway SQLite database; no OpenAI key needed.
+
+Usage (from backend/):
+    python -m benchmarks.project_context_cache [--turns 5]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+
+import httpx  # noqa: E402
+
+import main as app_main  # noqa: E402
+from metrics import metrics  # noqa: E402
+
+
+class _StubCompletions:
+    async def create(self, **kwargs):
+        message = types.SimpleNamespace(content="stub reply")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+class _StubModel:
+    def __init__(self):
+        self.chat = types.SimpleNamespace(completions=_StubCompletions())
+
+
+def _context_counters() -> tuple[int, int]:
+    counters = metrics.snapshot()["counters"]
+    return counters.get("prompt.project_context_hits", 0), counters.get("prompt.project_context_misses", 0)
+
+
+async def run(turns: int) -> list[tuple[str, int, int]]:
+    app_main.app.state.openai = _StubModel()
+    transport = httpx.ASGITransport(app=app_main.app)
+    steps: list[tuple[str, int, int]] = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench/api") as client:
+        project_id = (await client.post("/projects", json={"title": "context cache"})).json()["id"]
+
+        async def turn(label: str) -> None:
+            before = _context_counters()
+            r = await client.post(f"/projects/{project_id}/messages", json={"content": "hello", "agent": "strategy"})
+            r.raise_for_status()
+            after = _context_counters()
+            steps.append((label, after[0] - before[0], after[1] - before[1]))
+
+        for i in range(turns):
+            await turn(f"turn {i + 1}")
+        (await client.patch(f"/projects/{project_id}", json={"description": "edited"})).raise_for_status()
+        await turn("after edit")
+    return steps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    steps = asyncio.run(run(args.turns))
+    expected_misses = [1] + [0] * (args.turns - 1) + [1]
+    for label, hits, misses in steps:
+        print(f"{label:<11} hits {hits}  misses {misses}")
+    ok = [misses for _, _, misses in steps] == expected_misses
+    print("project context reused across turns" if ok else "project context was rebuilt on turns that didn't change it")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
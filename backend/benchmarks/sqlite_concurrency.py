@@ -0,0 +1,150 @@
+"""
+Concurrent read/write throughput of the SQLite engine profiles.
+
+Runs writer threads (insert + commit a chat message) next to reader threads
+(load one agent's history) against a throwaway database file, once per
+profile, and prints ops/sec, read latency, and how many operations failed
+with "database is locked".
+
+Both profiles get the same offered load: each writer is paced at
+--write-rate commits/s, and readers load a project the writers don't touch,
+so a read costs the same however many writes landed. Unpaced writers
+(--write-rate 0) skew the comparison on small machines: readers and writers
+are both CPU-bound Python (ORM flush, row loading), and WAL commits ~3x
+more writes than the rollback journal, which leaves the readers less CPU.
+That, not readers blocking on WAL, is why an unpaced run against the
+written project reads ~20% less on one core; mmap/cache size and pool size
+made no difference.
+
+Usage (from backend/):
+    python -m benchmarks.sqlite_concurrency [--seconds 5] [--writers 4] [--readers 8] [--write-rate 5]
+"""
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import Base, build_engine  # noqa: E402
+from models import ChatMessage, Project  # noqa: E402
+
+AGENTS = ["strategy", "research", "concept", "present"]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run_profile(profile: str, seconds: float, writers: int, readers: int, write_rate: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        eng = build_engine(url, profile)
+        Base.metadata.create_all(eng)
+        Session = sessionmaker(bind=eng, autoflush=False)
+
+        with Session() as db:
+            written, read = Project(title="written"), Project(title="read")
+            db.add_all([written, read])
+            db.flush()
+            write_project_id, read_project_id = written.id, read.id
+            for project_id in (write_project_id, read_project_id):
+                db.add_all(
+                    ChatMessage(project_id=project_id, seq=i + 1, role="user", content="seed " * 40, agent=AGENTS[i % 4])
+                    for i in range(2000)
+                )
+            db.commit()
+
+        counts = {"writes": 0, "reads": 0, "locked": 0}
+        read_times: list[float] = []
+        lock = threading.Lock()
+        next_seq = itertools.count(2001)
+        stop = time.perf_counter() + seconds
+
+        def bump(key: str) -> None:
+            with lock:
+                counts[key] += 1
+
+        def writer(n: int) -> None:
+            due = time.perf_counter()
+            while time.perf_counter() < stop:
+                if write_rate > 0:
+                    due += 1 / write_rate
+                    time.sleep(max(0.0, due - time.perf_counter()))
+                with lock:
+                    seq = next(next_seq)
+                try:
+                    with Session() as db:
+                        db.add(ChatMessage(
+                            project_id=write_project_id, seq=seq, role="user", content="w " * 40, agent=AGENTS[n % 4],
+                        ))
+                        db.commit()
+                    bump("writes")
+                except OperationalError:
+                    bump("locked")
+
+        def reader(n: int) -> None:
+            while time.perf_counter() < stop:
+                started = time.perf_counter()
+                try:
+                    with Session() as db:
+                        db.scalars(
+                            select(ChatMessage)
+                            .where(ChatMessage.project_id == read_project_id, ChatMessage.agent == AGENTS[n % 4])
+                            .order_by(ChatMessage.seq)
+                        ).all()
+                    bump("reads")
+                    with lock:
+                        read_times.append(time.perf_counter() - started)
+                except OperationalError:
+                    bump("locked")
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        eng.dispose()
+
+    return {
+        "profile": profile,
+        "writes/s": counts["writes"] / seconds,
+        "reads/s": counts["reads"] / seconds,
+        "read_p50": _percentile(read_times, 0.5),
+        "read_p95": _percentile(read_times, 0.95),
+        "read_max": max(read_times),
+        "locked": counts["locked"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--write-rate", type=float, default=5.0, help="commits/s per writer; 0 = as fast as possible")
+    args = parser.parse_args()
+
+    offered = f"{args.writers * args.write_rate:.0f}/s" if args.write_rate > 0 else "unpaced"
+    print(f"write load offered: {offered}")
+    print(f"{'profile':<15}{'writes/s':>10}{'reads/s':>10}{'read p50':>10}{'p95':>8}{'max':>8}{'locked':>8}")
+    for profile in ("sqlite-legacy", "sqlite"):
+        r = run_profile(profile, args.seconds, args.writers, args.readers, args.write_rate)
+        print(
+            f"{r['profile']:<15}{r['writes/s']:>10.1f}{r['reads/s']:>10.1f}"
+            f"{r['read_p50'] * 1000:>8.0f}ms{r['read_p95'] * 1000:>6.0f}ms{r['read_max'] * 1000:>6.0f}ms{r['locked']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Wake-ups for the /projects/{id}/events SSE stream.
+
+The stream itself reads what changed from the project_changes log, so the
+broker only has to say "project X committed something". Which backend does
+that is chosen with EVENTS_BACKEND:
+
+    memory    — in-process fan-out; instant, but a write only wakes streams
+                served by the same worker (the default)
+    database  — streams poll Project.version every EVENTS_POLL_INTERVAL
+                seconds; works across any number of uvicorn workers
+
+Writers don't call the broker directly: every committed session announces
+the projects its flushes touched (models._record_project_changes).
+"""
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "memory")
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "1.0"))
+
+
+class Subscription:
+    """One stream's wake-up flag; `wait()` returns early when the project is published."""
+
+    def __init__(self, poll_interval: Optional[float] = None):
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        self._poll_interval = poll_interval
+
+    def notify(self) -> None:
+        # Writers run in sync routes' worker threads as well as on the event loop
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    async def wait(self, timeout: float) -> None:
+        if self._poll_interval is not None:
+            timeout = min(timeout, self._poll_interval)
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._event.clear()
+
+
+class MemoryBackend:
+    """Per-process fan-out keyed by project id."""
+
+    poll_interval: Optional[float] = None
+
+    def __init__(self):
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, project_id: str) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(project_id, ()))
+        for sub in subscribers:
+            sub.notify()
+
+    @asynccontextmanager
+    async def subscribe(self, project_id: str) -> AsyncIterator[Subscription]:
+        sub = Subscription(self.poll_interval)
+        with self._lock:
+            self._subscribers.setdefault(project_id, set()).add(sub)
+        try:
+            yield sub
+        finally:
+            with self._lock:
+                subs = self._subscribers.get(project_id)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[project_id]
+
+
+class DatabaseBackend(MemoryBackend):
+    """
+    Same-process writes still wake streams immediately; writes from other
+    workers are picked up by polling the project version.
+    """
+
+    def __init__(self, poll_interval: float = EVENTS_POLL_INTERVAL):
+        super().__init__()
+        self.poll_interval = poll_interval
+
+
+BACKENDS = {"memory": MemoryBackend, "database": DatabaseBackend}
+
+if EVENTS_BACKEND not in BACKENDS:
+    raise ValueError(f"Unknown EVENTS_BACKEND {EVENTS_BACKEND!r}. Must be one of: {', '.join(BACKENDS)}")
+
+broker = BACKENDS[EVENTS_BACKEND]()
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session) -> None:
+    for project_id in session.info.pop("touched_projects", ()):
+        broker.publish(project_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session) -> None:
+    session.info.pop("touched_projects", None)
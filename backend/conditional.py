@@ -0,0 +1,45 @@
+"""
+Conditional GETs for per-project resources.
+
+Every write to a project, its messages, board items or summaries bumps
+Project.version (see models._record_project_changes), so the version alone
+identifies the state of anything served under /projects/{id}. Routes call
+`not_modified()` before loading any heavy rows.
+"""
+from typing import Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Project
+
+
+def project_etag(version: int) -> str:
+    return f'W/"v{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    # Weak comparison: W/"x" and "x" refer to the same representation
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
+
+def not_modified(db: Session, project_id: str, if_none_match: Optional[str], response: Response) -> Optional[Response]:
+    """
+    Look up only the project's version. Returns a 304 response if the client's
+    ETag is current; otherwise sets ETag on `response` and returns None.
+    Raises 404 if the project doesn't exist.
+    """
+    version = db.scalar(select(Project.version).where(Project.id == project_id))
+    if version is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    etag = project_etag(version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
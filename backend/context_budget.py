@@ -0,0 +1,152 @@
+"""
+Token budgeting for chat prompts.
+
+Each agent's history gets a token budget (HISTORY_BUDGETS). While an
+agent's verbatim turns fit, they are all sent. Once they cross the budget,
+the oldest turns are folded into a rolling summary (AgentContextSummary,
+refreshed by routers/chat.py) until the remaining turns are back under
+FOLD_TARGET of the budget. The summary therefore only has to be
+extended every few turns, not on every message.
+
+Tokens are counted locally with tiktoken's o200k_base encoding when it is
+available, falling back to a ~4 characters/token estimate otherwise.
+"""
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Sequence
+
+from metrics import metrics
+
+logger = logging.getLogger("dossier.context")
+
+DEFAULT_HISTORY_BUDGET = int(os.getenv("CONTEXT_HISTORY_BUDGET", "12000"))
+
+# Per-agent verbatim-history budgets (tokens). Research replies carry web
+# results and long References blocks, so it folds sooner.
+HISTORY_BUDGETS: dict[str, int] = {
+    "strategy": DEFAULT_HISTORY_BUDGET,
+    "research": int(os.getenv("CONTEXT_RESEARCH_HISTORY_BUDGET", str(DEFAULT_HISTORY_BUDGET * 2 // 3))),
+    "concept": DEFAULT_HISTORY_BUDGET,
+    "present": DEFAULT_HISTORY_BUDGET,
+}
+
+FOLD_TARGET = 0.6       # after folding, verbatim history is at most this share of the budget
+MIN_RECENT_TURNS = 4    # never fold the newest few turns, however long they are
+
+MESSAGE_OVERHEAD_TOKENS = 4   # role + separators per chat message
+IMAGE_TOKENS = 765            # one high-detail image tile set, roughly
+
+
+_encoder: Any = None
+_encoder_loaded = False
+
+
+def _get_encoder() -> Any:
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("o200k_base")
+        except Exception as e:  # not installed, or the BPE file can't be fetched offline
+            logger.warning("tiktoken unavailable (%s); estimating tokens from character counts", e)
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: dict) -> int:
+    """Tokens for one chat-completions message, string or multimodal content."""
+    content = message.get("content")
+    if isinstance(content, str):
+        return MESSAGE_OVERHEAD_TOKENS + count_tokens(content)
+    total = MESSAGE_OVERHEAD_TOKENS
+    for part in content or []:
+        if part.get("type") == "text":
+            total += count_tokens(part.get("text", ""))
+        elif part.get("type") == "image_url":
+            total += IMAGE_TOKENS
+    return total
+
+
+def history_budget(agent: str) -> int:
+    return HISTORY_BUDGETS.get((agent or "").lower(), DEFAULT_HISTORY_BUDGET)
+
+
+@dataclass
+class HistoryPlan:
+    """How one agent's history is sent: folded into the summary, or verbatim."""
+
+    fold: list = field(default_factory=list)     # turns to add to the rolling summary now
+    recent: list = field(default_factory=list)   # turns sent verbatim
+
+
+def plan_history(history: Sequence, agent: str, summarized_through: int = 0) -> HistoryPlan:
+    """
+    Split `history` (ChatMessages, oldest first, with `seq`) for the prompt.
+    Turns at or below `summarized_through` are already in the rolling summary.
+    """
+    live = [m for m in history if m.seq > summarized_through and (m.content or "").strip()]
+    sizes = [MESSAGE_OVERHEAD_TOKENS + count_tokens(m.content) for m in live]
+    budget = history_budget(agent)
+    if sum(sizes) <= budget:
+        return HistoryPlan(recent=live)
+
+    # Keep the newest turns that fit under the fold target; fold everything older
+    target = budget * FOLD_TARGET
+    kept, used = 0, 0
+    for size in reversed(sizes):
+        if kept >= MIN_RECENT_TURNS and used + size > target:
+            break
+        kept += 1
+        used += size
+    split = len(live) - kept
+    return HistoryPlan(fold=live[:split], recent=live[split:])
+
+
+@dataclass
+class ContextBreakdown:
+    """Token counts for one assembled prompt."""
+
+    agent: str
+    system: int = 0             # base + project context + agent prompt + output format
+    shared_summaries: int = 0   # other agents' detail summaries inside the system prompt
+    rolling_summary: int = 0    # folded older turns
+    history: int = 0            # verbatim turns
+    history_turns: int = 0
+    new_message: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.system + self.shared_summaries + self.rolling_summary + self.history + self.new_message
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "system": self.system,
+            "shared_summaries": self.shared_summaries,
+            "rolling_summary": self.rolling_summary,
+            "history": self.history,
+            "history_turns": self.history_turns,
+            "new_message": self.new_message,
+            "total": self.total,
+        }
+
+
+def report(breakdown: ContextBreakdown) -> None:
+    """Log the breakdown and feed it to /api/metrics."""
+    values = breakdown.as_dict()
+    logger.info(
+        "prompt tokens agent=%s total=%d system=%d shared=%d rolling=%d history=%d (%d turns) new=%d",
+        breakdown.agent or "-", values["total"], values["system"], values["shared_summaries"],
+        values["rolling_summary"], values["history"], values["history_turns"], values["new_message"],
+    )
+    for name, value in values.items():
+        metrics.observe(f"context.{name}", value)
@@ -1,15 +1,125 @@
-from sqlalchemy import create_engine
+import os
+from typing import Any
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
-DATABASE_URL = "sqlite:///./dossier.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dossier.db")
+
+# Sync URL driver -> async driver used by the AsyncEngine
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+# ── Engine profiles ───────────────────────────────────────────────────────────
+# Selected with DB_PROFILE; defaults to "sqlite" or "postgres" based on DATABASE_URL.
+#
+#   sqlite         — WAL journal, synchronous=NORMAL, busy_timeout, mmap + page cache.
+#                    Readers no longer block the writer (and vice versa); at the
+#                    same write load reads are as fast or faster than legacy
+#                    (benchmarks/sqlite_concurrency.py).
+#   sqlite-legacy  — the old rollback-journal setup (only check_same_thread=False);
+#                    kept for comparison benchmarks.
+#   postgres       — larger pool with pre-ping and connection recycling.
+
+ENGINE_PROFILES: dict[str, dict[str, Any]] = {
+    "sqlite": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,          # ms to wait on a locked database before failing
+            "mmap_size": 268435456,        # 256 MB memory-mapped I/O
+            "cache_size": -65536,          # negative = KiB, i.e. 64 MB page cache per connection
+            "temp_store": "MEMORY",
+        },
+        "engine": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30},
+    },
+    "sqlite-legacy": {
+        "pragmas": {},
+        "engine": {},
+    },
+    "postgres": {
+        "pragmas": {},
+        "engine": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30, "pool_pre_ping": True, "pool_recycle": 1800},
+    },
+}
+
+
+def _default_profile(url: str) -> str:
+    return "sqlite" if make_url(url).get_backend_name() == "sqlite" else "postgres"
+
+
+DB_PROFILE = os.getenv("DB_PROFILE") or _default_profile(DATABASE_URL)
+
+
+def _to_async_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (aiosqlite / asyncpg)."""
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.drivername)
+    if driver is None:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def _engine_kwargs(url: str, profile: str) -> dict[str, Any]:
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}. Must be one of: {', '.join(ENGINE_PROFILES)}")
+    kwargs = dict(ENGINE_PROFILES[profile]["engine"])
+    if "pool_size" in kwargs:
+        kwargs["pool_size"] = int(os.getenv("DB_POOL_SIZE", kwargs["pool_size"]))
+        kwargs["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", kwargs["max_overflow"]))
+    if make_url(url).get_backend_name() == "sqlite":
+        kwargs["connect_args"] = {"check_same_thread": False}  # required for SQLite + FastAPI
+    return kwargs
+
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  # required for SQLite + FastAPI
-)
+def _install_pragmas(sync_engine: Engine, profile: str) -> None:
+    pragmas = ENGINE_PROFILES[profile]["pragmas"]
+    if not pragmas:
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def build_engine(url: str = DATABASE_URL, profile: str = DB_PROFILE) -> Engine:
+    """Create a sync Engine configured for the given profile."""
+    eng = create_engine(url, **_engine_kwargs(url, profile))
+    _install_pragmas(eng, profile)
+    return eng
+
+
+def build_async_engine(url: str = DATABASE_URL, profile: str = DB_PROFILE) -> AsyncEngine:
+    """Create an AsyncEngine (aiosqlite / asyncpg) configured for the given profile."""
+    async_url = _to_async_url(url)
+    eng = create_async_engine(async_url, **_engine_kwargs(async_url, profile))
+    _install_pragmas(eng.sync_engine, profile)
+    return eng
+
+
+ASYNC_DATABASE_URL = _to_async_url(DATABASE_URL)
+
+engine = build_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for `async def` routes — DB I/O no longer blocks the event loop
+async_engine = build_async_engine()
+
+# expire_on_commit=False: attributes stay loaded after commit, since lazy
+# refreshes are not allowed on an AsyncSession
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 class Base(DeclarativeBase):
     pass
@@ -22,3 +132,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """FastAPI dependency that provides an AsyncSession per request (for `async def` routes)."""
+    async with AsyncSessionLocal() as db:
+        yield db
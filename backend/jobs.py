@@ -0,0 +1,316 @@
+"""
+Durable background queue for LLM work (summaries, chat and Research replies).
+
+Jobs are rows in the `jobs` table, so they survive restarts and every
+worker process sharing the database sees the same queue:
+
+    job = await enqueue(db, "summary", {"agent": "strategy"}, project_id=project_id)
+    await db.commit()
+    wake_workers()
+
+A worker claims the runnable job that has waited longest with one atomic
+UPDATE (FOR UPDATE SKIP LOCKED on Postgres) and holds a lease on it,
+renewed while the handler runs. If the worker dies, the lease expires and
+another worker picks the job up again. Failures are retried with jittered
+exponential backoff until `max_attempts`; after that — or straight away for
+PermanentJobError and 4xx HTTPExceptions — the job is marked failed and
+the handler's `on_give_up` hook runs.
+
+Handlers are registered with @job_handler (see routers/chat.py). Workers
+run inside the app (JOB_WORKERS per process, started by main.lifespan) or
+as separate processes (worker.py):
+
+    python worker.py [--concurrency 4]
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+import anyio
+from fastapi import HTTPException
+from openai import AsyncOpenAI
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+from metrics import metrics
+from models import Job
+
+logger = logging.getLogger("dossier.jobs")
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))                   # in-process workers; 0 = separate worker processes only
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_RETRY_MAX_SECONDS = 300.0
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help."""
+
+
+@dataclass
+class JobHandler:
+    run: Callable[[AsyncOpenAI, Job], Awaitable[Any]]          # returns the JSON-serializable result
+    on_give_up: Optional[Callable[[Job, str], Awaitable[None]]] = None
+
+
+HANDLERS: dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str, on_give_up: Optional[Callable[[Job, str], Awaitable[None]]] = None):
+    """Register the decorated coroutine as the runner for jobs of `kind`."""
+    def register(run: Callable[[AsyncOpenAI, Job], Awaitable[Any]]):
+        HANDLERS[kind] = JobHandler(run=run, on_give_up=on_give_up)
+        return run
+    return register
+
+
+async def enqueue(
+    db: AsyncSession,
+    kind: str,
+    payload: dict,
+    project_id: Optional[str] = None,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+) -> Job:
+    """Add a job to the caller's transaction; it becomes claimable once committed."""
+    if kind not in HANDLERS:
+        raise ValueError(f"No job handler registered for {kind!r}")
+    job = Job(kind=kind, project_id=project_id, payload=payload, max_attempts=max_attempts, run_after=_now())
+    db.add(job)
+    await db.flush()
+    metrics.incr(f"jobs.{kind}.enqueued")
+    return job
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before attempt `attempts + 1`: exponential, capped, with ±20% jitter."""
+    delay = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+# ── Claiming and finishing ────────────────────────────────────────────────────
+
+def _runnable(now: datetime):
+    """Queued and due, or running on a lease nobody renewed."""
+    return or_(
+        and_(Job.status == "queued", Job.run_after <= now),
+        and_(Job.status == "running", Job.lease_expires_at < now, Job.attempts < Job.max_attempts),
+    )
+
+
+async def _reap_expired() -> list[Job]:
+    """Fail jobs whose worker died on their last attempt."""
+    now = _now()
+    async with AsyncSessionLocal() as db:
+        jobs = (await db.scalars(
+            update(Job)
+            .where(Job.status == "running", Job.lease_expires_at < now, Job.attempts >= Job.max_attempts)
+            .values(status="failed", error="Worker stopped responding", lease_expires_at=None, updated_at=now)
+            .returning(Job)
+        )).all()
+        await db.commit()
+    return list(jobs)
+
+
+async def _claim(worker_id: str) -> Optional[Job]:
+    now = _now()
+    candidate = (
+        select(Job.id)
+        .where(_runnable(now))
+        .order_by(Job.run_after)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    async with AsyncSessionLocal() as db:
+        job = await db.scalar(
+            update(Job)
+            .where(Job.id == candidate, _runnable(now))
+            .values(
+                status="running",
+                attempts=Job.attempts + 1,
+                worker_id=worker_id,
+                lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS),
+                updated_at=now,
+            )
+            .returning(Job)
+        )
+        await db.commit()
+    return job
+
+
+async def _update_own(job: Job, worker_id: str, **values: Any) -> bool:
+    """Update a job this worker still holds; False if its lease was lost to another worker."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.worker_id == worker_id, Job.status == "running")
+            .values(updated_at=_now(), **values)
+        )
+        await db.commit()
+    return result.rowcount > 0
+
+
+async def _give_up(job: Job, error: str) -> None:
+    metrics.incr(f"jobs.{job.kind}.failed")
+    handler = HANDLERS.get(job.kind)
+    if handler is not None and handler.on_give_up is not None:
+        try:
+            await handler.on_give_up(job, error)
+        except Exception:
+            logger.exception("on_give_up failed for job %s (%s)", job.id, job.kind)
+
+
+async def _heartbeat(job: Job, worker_id: str, run: asyncio.Task) -> None:
+    """
+    Renew the job's lease while `run` works on it. Failed renewals are
+    retried; once the lease is lost, or would expire before the next try,
+    `run` is cancelled so the job doesn't run twice after another worker
+    claims it.
+    """
+    expires_at = _as_utc(job.lease_expires_at)
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        lease = _now() + timedelta(seconds=JOB_LEASE_SECONDS)
+        try:
+            if not await _update_own(job, worker_id, lease_expires_at=lease):
+                logger.warning("job %s (%s) lost its lease, stopping it", job.id, job.kind)
+                break
+            expires_at = lease
+        except Exception:
+            logger.exception("could not renew the lease on job %s (%s)", job.id, job.kind)
+            if _now() + timedelta(seconds=JOB_LEASE_SECONDS / 3) >= expires_at:
+                logger.warning("job %s (%s) lease is running out, stopping it", job.id, job.kind)
+                break
+    metrics.incr(f"jobs.{job.kind}.lease_lost")
+    run.cancel()
+
+
+async def _execute(client: AsyncOpenAI, job: Job, worker_id: str) -> None:
+    handler = HANDLERS.get(job.kind)
+    metrics.observe(f"jobs.{job.kind}.wait_seconds", (_now() - _as_utc(job.created_at)).total_seconds())
+    heartbeat: Optional[asyncio.Task] = None
+    started = _now()
+    try:
+        if handler is None:
+            raise PermanentJobError(f"No job handler registered for {job.kind!r}")
+        run = asyncio.create_task(handler.run(client, job))
+        heartbeat = asyncio.create_task(_heartbeat(job, worker_id, run))
+        result = await run
+    except asyncio.CancelledError:
+        if heartbeat is not None and heartbeat.done():
+            return  # stopped by _heartbeat: the job is no longer ours to update
+        # Worker shutting down: hand the job back without spending an attempt
+        with anyio.CancelScope(shield=True):
+            try:
+                await _update_own(
+                    job, worker_id, status="queued", attempts=job.attempts - 1,
+                    run_after=_now(), lease_expires_at=None, worker_id=None,
+                )
+            except Exception:
+                logger.exception("could not hand job %s (%s) back", job.id, job.kind)
+        raise
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        permanent = isinstance(e, PermanentJobError) or (isinstance(e, HTTPException) and e.status_code < 500)
+        if permanent or job.attempts >= job.max_attempts:
+            logger.warning("job %s (%s) failed after %d attempt(s): %s", job.id, job.kind, job.attempts, detail)
+            if await _update_own(job, worker_id, status="failed", error=str(detail), lease_expires_at=None):
+                await _give_up(job, str(detail))
+        else:
+            delay = retry_delay(job.attempts)
+            logger.info("job %s (%s) attempt %d failed, retrying in %.0fs: %s", job.id, job.kind, job.attempts, delay, detail)
+            metrics.incr(f"jobs.{job.kind}.retried")
+            await _update_own(
+                job, worker_id, status="queued", error=str(detail),
+                run_after=_now() + timedelta(seconds=delay), lease_expires_at=None,
+            )
+    else:
+        await _update_own(job, worker_id, status="succeeded", result=result, error=None, lease_expires_at=None)
+        metrics.incr(f"jobs.{job.kind}.succeeded")
+        metrics.observe(f"jobs.{job.kind}.run_seconds", (_now() - started).total_seconds())
+    finally:
+        if heartbeat is not None:
+            heartbeat.cancel()
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands DateTime(timezone=True) values back naive
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+# ── Workers ───────────────────────────────────────────────────────────────────
+
+_workers: list["JobWorker"] = []
+
+
+def wake_workers() -> None:
+    """Let this process's idle workers look for a just-committed job now instead of at their next poll."""
+    for worker in _workers:
+        worker.wake()
+
+
+class JobWorker:
+    """Claims and runs jobs, up to `concurrency` at a time, until stopped."""
+
+    def __init__(self, client: AsyncOpenAI, concurrency: int = 1):
+        self.client = client
+        self.concurrency = max(1, concurrency)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+        _workers.append(self)
+        logger.info("job worker %s started (%d slots)", self.worker_id, self.concurrency)
+
+    async def stop(self) -> None:
+        if self in _workers:
+            _workers.remove(self)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self) -> None:
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                for job in await _reap_expired():
+                    await _give_up(job, job.error or "Worker stopped responding")
+                job = await _claim(self.worker_id)
+            except Exception:
+                logger.exception("job worker %s could not claim a job", self.worker_id)
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            try:
+                await _execute(self.client, job, self.worker_id)
+            except Exception:
+                # Recording the outcome failed; the lease runs out and the job is retried or reaped
+                logger.exception("job worker %s could not finish job %s (%s)", self.worker_id, job.id, job.kind)
+
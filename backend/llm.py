@@ -0,0 +1,85 @@
+"""
+The app's one OpenAI client.
+
+Built when the app starts (main.lifespan) and closed on shutdown, so every
+chat, research and summary call reuses the same pooled HTTP/2 connections
+instead of paying DNS + TLS setup per request. Routes take it with
+`Depends(get_openai_client)`.
+"""
+import os
+from typing import Any, Optional
+
+import httpx
+from fastapi import HTTPException, Request
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from metrics import metrics
+
+# Research turns can run for minutes (web search + up to 10k output tokens),
+# so only connecting and waiting for a pooled connection are kept short.
+LLM_TIMEOUT = httpx.Timeout(
+    connect=float(os.getenv("LLM_CONNECT_TIMEOUT", "5")),
+    read=float(os.getenv("LLM_READ_TIMEOUT", "300")),
+    write=30.0,
+    pool=float(os.getenv("LLM_POOL_TIMEOUT", "10")),
+)
+
+LLM_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20")),
+    keepalive_expiry=60.0,
+)
+
+# Rate limits and transient errors are retried by llm_scheduler, which also
+# holds back other queued calls on a 429; SDK-level retries would bypass that.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "0"))
+
+
+def build_openai_client() -> Optional[AsyncOpenAI]:
+    """AsyncOpenAI over a tuned HTTP/2 connection pool; None when OPENAI_API_KEY is unset."""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    http_client = DefaultAsyncHttpxClient(http2=True, limits=LLM_LIMITS, timeout=LLM_TIMEOUT)
+    return AsyncOpenAI(api_key=api_key, http_client=http_client, timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES)
+
+
+def get_openai_client(request: Request) -> AsyncOpenAI:
+    """FastAPI dependency returning the lifespan-scoped client."""
+    client = getattr(request.app.state, "openai", None)
+    if client is None:
+        raise HTTPException(
+            status_code=503,
+            detail="OpenAI API key not configured. Add OPENAI_API_KEY to your .env file.",
+        )
+    return client
+
+
+def prompt_cache_key(project_id: str, agent: str) -> str:
+    """
+    `prompt_cache_key` for a chat turn. Turns of one agent in one project share
+    the longest prefix (static instructions + project context + history), so
+    routing them together keeps them on the same provider cache.
+    """
+    return f"dossier:{project_id}:{(agent or '').lower()}"
+
+
+def record_usage(kind: str, usage: Any) -> None:
+    """
+    Feed one call's token usage (Chat Completions or Responses shape) to
+    /api/metrics: prompt and cached prompt tokens per call kind, and the
+    per-call cache hit rate.
+    """
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    if prompt_tokens is None:
+        prompt_tokens = getattr(usage, "input_tokens", None) or 0
+        details = getattr(usage, "input_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None) or 0
+    metrics.incr(f"llm.{kind}.calls")
+    metrics.incr(f"llm.{kind}.prompt_tokens", prompt_tokens)
+    metrics.incr(f"llm.{kind}.cached_tokens", cached_tokens)
+    if prompt_tokens:
+        metrics.observe(f"llm.{kind}.cache_hit_rate", cached_tokens / prompt_tokens)
@@ -0,0 +1,318 @@
+"""
+One scheduler in front of every OpenAI call.
+
+    response = await scheduler.call(
+        project_id, estimate_tokens(messages, 3000),
+        client.chat.completions.create, model="gpt-5.2", messages=messages, ...
+    )
+
+    async with scheduler.stream(project_id, tokens, client.chat.completions.create, ..., stream=True) as chunks:
+        async for chunk in chunks: ...
+
+A call runs once it gets one of LLM_MAX_CONCURRENCY slots and its
+estimated tokens (prompt + max output, as the provider counts them) fit
+the LLM_TOKENS_PER_MINUTE bucket. Waiting calls queue per project and are
+served round-robin across projects, so a project running a long
+map-reduce summary can't starve everyone else's chat turns.
+
+A 429 pauses the whole scheduler for the Retry-After the provider sent
+(rate limits are per account, so every queued call would hit it too).
+429s, 5xx responses and connection errors are retried with jittered
+exponential backoff, up to LLM_SCHEDULER_RETRIES times, before the error
+reaches the caller; routes turn it into an HTTP error with upstream_error().
+
+The budgets are per process: with several workers, divide the account's
+limits between them. Queue depth, waits and retries go to /api/metrics.
+"""
+import asyncio
+import email.utils
+import logging
+import math
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Sequence
+
+from fastapi import HTTPException
+from openai import APIConnectionError, APIStatusError, OpenAIError, RateLimitError
+
+from context_budget import count_tokens, message_tokens
+from metrics import metrics
+
+logger = logging.getLogger("dossier.llm")
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))  # 0 = no token budget
+LLM_SCHEDULER_RETRIES = int(os.getenv("LLM_SCHEDULER_RETRIES", "4"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "1"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "60"))
+
+
+def estimate_tokens(messages: Sequence[dict], max_output_tokens: int) -> int:
+    """What a call counts against the TPM limit: its prompt plus the output it may produce."""
+    return sum(message_tokens(m) for m in messages) + max_output_tokens
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds from the response's retry-after-ms / retry-after header, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(value)
+            return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, (RateLimitError, APIConnectionError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+def upstream_error(error: OpenAIError, detail: Optional[str] = None) -> HTTPException:
+    """502 for a failed model call; 503 with Retry-After when we are still rate limited after retrying."""
+    detail = detail or str(error)
+    if isinstance(error, RateLimitError):
+        retry_after = _retry_after(error) or LLM_RETRY_BASE_SECONDS
+        return HTTPException(status_code=503, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+    return HTTPException(status_code=502, detail=detail)
+
+
+class _MeteredStream:
+    """
+    A streamed call's chunks / events, passed through while noting what the
+    call spends: the usage the provider reports at the end (the final chat
+    chunk's `usage`, or `response.usage` on response.completed /
+    response.incomplete), else an estimate from the text streamed so far.
+    """
+
+    def __init__(self, stream: Any, prompt_tokens: float):
+        self._stream = stream
+        self.prompt_tokens = prompt_tokens
+        self.output_tokens = 0
+        self.usage: Any = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        async for item in self._stream:
+            self._note(item)
+            yield item
+
+    def _note(self, item: Any) -> None:
+        usage = getattr(item, "usage", None) or getattr(getattr(item, "response", None), "usage", None)
+        if usage is not None:
+            self.usage = usage
+        choices = getattr(item, "choices", None)
+        if choices:
+            text = getattr(choices[0].delta, "content", None)
+        else:
+            text = item.delta if getattr(item, "type", None) == "response.output_text.delta" else None
+        if text:
+            self.output_tokens += count_tokens(text)
+
+    def spent(self) -> float:
+        total = getattr(self.usage, "total_tokens", None)
+        return total if total is not None else self.prompt_tokens + self.output_tokens
+
+
+def _max_output_tokens(kwargs: dict) -> int:
+    for name in ("max_completion_tokens", "max_output_tokens", "max_tokens"):
+        if kwargs.get(name):
+            return kwargs[name]
+    return 0
+
+
+class _Waiter:
+    __slots__ = ("tokens", "future", "queued_at")
+
+    def __init__(self, tokens: float, future: asyncio.Future):
+        self.tokens = tokens
+        self.future = future
+        self.queued_at = time.monotonic()
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        retries: int = LLM_SCHEDULER_RETRIES,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.capacity = float(tokens_per_minute) if tokens_per_minute > 0 else math.inf
+        self.retries = retries
+        self._tokens = self.capacity
+        self._refilled_at = time.monotonic()
+        self._active = 0
+        self._queues: "OrderedDict[str, deque[_Waiter]]" = OrderedDict()  # rotation order = service order
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    async def call(self, project_id: Optional[str], tokens: int, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` under the budgets, retrying transient failures."""
+        key = project_id or ""
+        for attempt in range(self.retries + 1):
+            reserved = await self._acquire(key, tokens)
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                self._release(reserved, used=0)
+                await self._before_retry(e, attempt)
+                continue
+            except BaseException:
+                self._release(reserved, used=0)
+                raise
+            usage = getattr(result, "usage", None)
+            self._release(reserved, used=getattr(usage, "total_tokens", None))
+            return result
+        raise AssertionError("unreachable")
+
+    @asynccontextmanager
+    async def stream(
+        self, project_id: Optional[str], tokens: int, fn: Callable[..., Awaitable[Any]], *args, **kwargs,
+    ) -> AsyncIterator[Any]:
+        """
+        Open a streaming call under the budgets and hold its slot until the
+        block exits. Only opening the stream is retried — once chunks flow,
+        errors go to the caller.
+
+        On exit the reservation is settled against the usage the stream
+        reported. A stream cut short before reporting any is charged its
+        prompt (the reservation minus the call's max output tokens) plus the
+        text it produced.
+        """
+        key = project_id or ""
+        for attempt in range(self.retries + 1):
+            reserved = await self._acquire(key, tokens)
+            try:
+                stream = await fn(*args, **kwargs)
+            except Exception as e:
+                self._release(reserved, used=0)
+                await self._before_retry(e, attempt)
+                continue
+            except BaseException:
+                self._release(reserved, used=0)
+                raise
+            metered = _MeteredStream(stream, max(0, reserved - _max_output_tokens(kwargs)))
+            try:
+                yield metered
+            finally:
+                self._release(reserved, used=metered.spent())
+            return
+
+    # ── Retries ───────────────────────────────────────────────────────────────
+
+    async def _before_retry(self, error: Exception, attempt: int) -> None:
+        """Re-raise `error` unless it is transient and retries remain; otherwise back off."""
+        if not _retryable(error) or attempt >= self.retries:
+            raise error
+        delay = min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = min(LLM_RETRY_MAX_SECONDS, retry_after) + random.uniform(0, 0.25)
+        if isinstance(error, RateLimitError):
+            # The limit is per account: hold every queued call, not just this one
+            metrics.incr("llm.scheduler.rate_limited")
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        metrics.incr("llm.scheduler.retries")
+        logger.info("LLM call failed (%s), retry %d in %.1fs", type(error).__name__, attempt + 1, delay)
+        await asyncio.sleep(delay)
+
+    # ── Slots and tokens ──────────────────────────────────────────────────────
+
+    async def _acquire(self, key: str, tokens: int) -> float:
+        reserved = min(float(tokens), self.capacity)
+        waiter = _Waiter(reserved, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(key, deque()).append(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(reserved, used=0)  # granted just as the caller went away
+            else:
+                self._forget(key, waiter)
+            raise
+        metrics.observe("llm.scheduler.wait_seconds", time.monotonic() - waiter.queued_at)
+        return reserved
+
+    def _release(self, reserved: float, used: Optional[float] = None) -> None:
+        """Free the slot; `used` settles the reservation against actual usage (0 = nothing was spent)."""
+        self._active -= 1
+        if used is not None and self.capacity != math.inf:
+            self._tokens = min(self.capacity, self._tokens + reserved - used)
+        self._dispatch()
+
+    def _forget(self, key: str, waiter: _Waiter) -> None:
+        queue = self._queues.get(key)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[key]
+        self._report()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.capacity != math.inf:
+            self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.capacity / 60)
+        self._refilled_at = now
+
+    def _dispatch(self) -> None:
+        """Grant queued calls, round-robin across projects, while slots and tokens last."""
+        self._refill()
+        while self._queues and self._active < self.max_concurrency:
+            now = time.monotonic()
+            if now < self._paused_until:
+                self._wake_in(self._paused_until - now)
+                break
+            key, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            if waiter.future.done():  # cancelled while queued
+                queue.popleft()
+                if not queue:
+                    del self._queues[key]
+                continue
+            if waiter.tokens > self._tokens:
+                self._wake_in((waiter.tokens - self._tokens) * 60 / self.capacity)
+                break
+            queue.popleft()
+            if queue:
+                self._queues.move_to_end(key)  # this project's next call waits for the others' turn
+            else:
+                del self._queues[key]
+            self._tokens -= waiter.tokens
+            self._active += 1
+            waiter.future.set_result(None)
+        self._report()
+
+    def _wake_in(self, seconds: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(max(seconds, 0.01), self._dispatch)
+
+    def _report(self) -> None:
+        metrics.gauge("llm.scheduler.queued", sum(len(q) for q in self._queues.values()))
+        metrics.gauge("llm.scheduler.queued_projects", len(self._queues))
+        metrics.gauge("llm.scheduler.active", self._active)
+        if self.capacity != math.inf:
+            metrics.gauge("llm.scheduler.tokens_available", round(self._tokens))
+
+
+scheduler = LLMScheduler()
@@ -12,19 +12,41 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("openai").setLevel(logging.WARNING)
 logging.getLogger("uvicorn").setLevel(logging.INFO)
 
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from database import engine, Base
-from routers import projects, chat, dossi_board
+from database import engine, async_engine, Base
+from jobs import JOB_WORKERS, JobWorker
+from llm import build_openai_client
+from metrics import metrics
+from routers import projects, chat, dossi_board, jobs, search
+from search_index import ensure_search_index
 import models  # noqa: F401 — ensures models are registered with Base
 
 UPLOAD_ROOT = Path(__file__).parent / "uploads" / "dossi_board"
 UPLOAD_ROOT.mkdir(parents=True, exist_ok=True)
 
-app = FastAPI(title="Dossier API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.openai = build_openai_client()
+    # In-process job workers; with JOB_WORKERS=0, run worker.py processes instead
+    job_worker = JobWorker(app.state.openai, JOB_WORKERS) if app.state.openai is not None and JOB_WORKERS > 0 else None
+    if job_worker is not None:
+        job_worker.start()
+    yield
+    if job_worker is not None:
+        await job_worker.stop()
+    if app.state.openai is not None:
+        await app.state.openai.close()
+    # Close pooled aiosqlite/asyncpg connections on shutdown
+    await async_engine.dispose()
+
+
+app = FastAPI(title="Dossier API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,14 +54,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Create all tables on startup (Alembic takes over for future migrations)
 Base.metadata.create_all(bind=engine)
+# FTS5 tables + triggers for /api/search (SQLite only; no-op elsewhere)
+with engine.begin() as conn:
+    ensure_search_index(conn)
 
 app.include_router(projects.router, prefix="/api")
 app.include_router(chat.router, prefix="/api")
 app.include_router(dossi_board.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
 
 # Serve uploaded dossi board files as static assets
 app.mount("/uploads/dossi_board", StaticFiles(directory=str(UPLOAD_ROOT)), name="dossi_board_uploads")
@@ -48,3 +76,9 @@ app.mount("/uploads/dossi_board", StaticFiles(directory=str(UPLOAD_ROOT)), name=
 @app.get("/api/health")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/api/metrics")
+def get_metrics():
+    """Per-process counters (prompt token breakdowns, …); see metrics.py."""
+    return metrics.snapshot()
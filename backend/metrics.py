@@ -0,0 +1,52 @@
+"""
+In-process counters and distributions, served as JSON at GET /api/metrics.
+
+    metrics.incr("llm.calls")
+    metrics.observe("context.total_tokens", 5123)
+    metrics.gauge("llm.scheduler.queued", 3)
+
+Values are per worker process and reset on restart — enough to watch
+token usage and cache behaviour without running a metrics stack.
+"""
+import threading
+from typing import Any
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._observations: dict[str, dict[str, float]] = {}
+        self._gauges: dict[str, float] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record one sample; the snapshot reports count / sum / mean / max / last."""
+        with self._lock:
+            stats = self._observations.setdefault(name, {"count": 0, "sum": 0.0, "max": value, "last": value})
+            stats["count"] += 1
+            stats["sum"] += value
+            stats["max"] = max(stats["max"], value)
+            stats["last"] = value
+
+    def gauge(self, name: str, value: float) -> None:
+        """Set a current level (queue depth, …); the snapshot reports the latest value."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "observations": {
+                    name: {**stats, "mean": stats["sum"] / stats["count"]}
+                    for name, stats in self._observations.items()
+                },
+            }
+
+
+metrics = Metrics()
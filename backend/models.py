@@ -1,8 +1,10 @@
+import os
 import uuid
 from datetime import datetime, timezone
 from typing import Optional
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import JSON, Boolean, DateTime, ForeignKey, Index, Integer, String, Text, delete, event, insert, update
+from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
+from sqlalchemy.orm.attributes import set_committed_value
 from database import Base
 
 
@@ -12,6 +14,10 @@ def _now() -> datetime:
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        # Home page listing: active/archived tab, most recently updated first
+        Index("ix_projects_archived_updated", "archived", "updated_at"),
+    )
 
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     title: Mapped[str] = mapped_column(String, nullable=False)
@@ -20,45 +26,51 @@ class Project(Base):
     thumbnail_index: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_now)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_now, onupdate=_now)
-
-    # Per-agent summaries
-    strategy_summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    strategy_problem_statement: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    strategy_assumptions: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    strategy_detail_summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-
-    research_summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    research_problem_statement: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    research_assumptions: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    research_detail_summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-
-    concept_summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    concept_problem_statement: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    concept_assumptions: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    concept_detail_summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-
-    present_summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    present_problem_statement: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    present_assumptions: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    present_detail_summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Last ChatMessage.seq handed out for this project (see routers/chat.py::_next_message_seq)
+    message_seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped on every write to the project or its messages / board items / summaries; drives ETags
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
 
     messages: Mapped[list["ChatMessage"]] = relationship(
-        "ChatMessage", back_populates="project", order_by="ChatMessage.created_at", cascade="all, delete-orphan"
+        "ChatMessage", back_populates="project", order_by="ChatMessage.seq", cascade="all, delete-orphan",
+        # Never hydrate the whole transcript implicitly — query by agent instead (see routers/chat.py)
+        lazy="raise",
     )
     dossi_board_items: Mapped[list["DossiBoardItem"]] = relationship(
         "DossiBoardItem", back_populates="project", order_by="DossiBoardItem.created_at", cascade="all, delete-orphan"
     )
+    # Per-agent summaries, one row per agent that has been summarized
+    agent_summaries: Mapped[list["AgentSummary"]] = relationship(
+        "AgentSummary", back_populates="project", cascade="all, delete-orphan"
+    )
+    context_summaries: Mapped[list["AgentContextSummary"]] = relationship(
+        "AgentContextSummary", cascade="all, delete-orphan", lazy="raise"
+    )
+    summary_chunks: Mapped[list["SummaryChunk"]] = relationship(
+        "SummaryChunk", cascade="all, delete-orphan", lazy="raise"
+    )
+    jobs: Mapped[list["Job"]] = relationship("Job", cascade="all, delete-orphan", lazy="raise")
 
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Per-project message order; also serves keyset pagination over the whole history
+        Index("uq_chat_messages_project_seq", "project_id", "seq", unique=True),
+        # Per-agent history, in message order
+        Index("ix_chat_messages_project_agent_seq", "project_id", "agent", "seq"),
+    )
 
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     project_id: Mapped[str] = mapped_column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)  # monotonic per project; stable sort key
     role: Mapped[str] = mapped_column(String, nullable=False)  # "user" | "assistant"
     content: Mapped[str] = mapped_column(Text, nullable=False)
     agent: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     image_url: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # "pending" while its turn awaits the model, "failed" (with `error`) if the call failed, else "complete"
+    status: Mapped[str] = mapped_column(String, nullable=False, default="complete", server_default="complete")
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_now)
 
     project: Mapped["Project"] = relationship("Project", back_populates="messages")
@@ -66,6 +78,13 @@ class ChatMessage(Base):
 
 class DossiBoardItem(Base):
     __tablename__ = "dossi_board_items"
+    __table_args__ = (
+        # Board listing (optionally by folder)
+        Index("ix_dossi_board_items_project_folder_created", "project_id", "folder", "created_at"),
+        # Reference dedupe / asset lookup, within one project or across all (board membership)
+        Index("ix_dossi_board_items_source_url_project", "source_url", "project_id"),
+        Index("ix_dossi_board_items_file_path_project", "file_path", "project_id"),
+    )
 
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     project_id: Mapped[str] = mapped_column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
@@ -77,3 +96,200 @@ class DossiBoardItem(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_now)
 
     project: Mapped["Project"] = relationship("Project", back_populates="dossi_board_items")
+
+
+class AgentSummary(Base):
+    __tablename__ = "agent_summaries"
+
+    project_id: Mapped[str] = mapped_column(
+        String, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True
+    )
+    agent: Mapped[str] = mapped_column(String, primary_key=True)  # "strategy" | "research" | "concept" | "present" | …
+    summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    problem_statement: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    assumptions: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    detail_summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Watermark: last ChatMessage.seq the generated summary covers (see routers/chat.py::summarize_agent)
+    through_seq: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_now, onupdate=_now)
+
+    project: Mapped["Project"] = relationship("Project", back_populates="agent_summaries")
+
+
+class AgentContextSummary(Base):
+    """
+    Rolling summary of an agent's older turns, sent in place of them once the
+    history outgrows its token budget (see context_budget.py). Internal prompt
+    state — not part of the change log or the project version.
+    """
+
+    __tablename__ = "agent_context_summaries"
+
+    project_id: Mapped[str] = mapped_column(String, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    agent: Mapped[str] = mapped_column(String, primary_key=True)
+    summary: Mapped[str] = mapped_column(Text, nullable=False, default="")
+    through_seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # last ChatMessage.seq folded in
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_now, onupdate=_now)
+
+
+class SummaryChunk(Base):
+    """
+    Notes on one token-bounded slice of an agent's transcript, the map step
+    of summarization.summarize_in_chunks. Cached so a re-run only redoes the
+    slices that changed. Internal prompt state, like AgentContextSummary.
+    """
+
+    __tablename__ = "summary_chunks"
+
+    project_id: Mapped[str] = mapped_column(String, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    agent: Mapped[str] = mapped_column(String, primary_key=True)
+    first_seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    last_seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    digest: Mapped[str] = mapped_column(String, nullable=False)  # sha256 of the slice's transcript text
+    notes: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_now)
+
+
+class Job(Base):
+    """
+    One unit of background LLM work, run by jobs.JobWorker. Rows are kept
+    after they finish so GET /jobs/{id} can report the outcome.
+    """
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the runnable job that has waited longest
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind: Mapped[str] = mapped_column(String, nullable=False)  # key into jobs.HANDLERS
+    project_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=True)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    status: Mapped[str] = mapped_column(String, nullable=False, default="queued")  # queued | running | succeeded | failed
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
+    run_after: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=_now)  # retry backoff
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    worker_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    result: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_now, onupdate=_now)
+
+
+
+class Lock(Base):
+    """
+    A named mutex shared by every process on the database (singleflight.DatabaseLocks).
+    The holder renews `expires_at` while it works; an expired row is free to take.
+    """
+
+    __tablename__ = "locks"
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    owner: Mapped[str] = mapped_column(String, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+# The change log keeps each project's last PROJECT_CHANGES_RETENTION versions.
+# Older cursors get `reset` from /changes and /events and reload the project.
+PROJECT_CHANGES_RETENTION = int(os.getenv("PROJECT_CHANGES_RETENTION", "1000"))
+PROJECT_CHANGES_PRUNE_EVERY = 100  # versions between prunes, so writes rarely pay for the DELETE
+
+
+class ProjectChange(Base):
+    """
+    Change log behind GET /projects/{id}/changes; one row per entity per
+    version, trimmed to the last PROJECT_CHANGES_RETENTION versions.
+    """
+
+    __tablename__ = "project_changes"
+    __table_args__ = (
+        Index("ix_project_changes_project_version", "project_id", "version"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    project_id: Mapped[str] = mapped_column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)  # Project.version this change produced
+    entity: Mapped[str] = mapped_column(String, nullable=False)     # "project" | "message" | "board_item" | "summary"
+    entity_id: Mapped[str] = mapped_column(String, nullable=False)  # row id; the agent name for "summary"
+    op: Mapped[str] = mapped_column(String, nullable=False)         # "upsert" | "delete"
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_now)
+
+
+def _change_key(obj) -> Optional[tuple[str, str, str]]:
+    """(project_id, entity, entity_id) for objects tracked by the change log."""
+    if isinstance(obj, Project):
+        return obj.id, "project", obj.id
+    if isinstance(obj, ChatMessage):
+        return obj.project_id, "message", obj.id
+    if isinstance(obj, DossiBoardItem):
+        return obj.project_id, "board_item", obj.id
+    if isinstance(obj, AgentSummary):
+        return obj.project_id, "summary", obj.agent
+    return None
+
+
+@event.listens_for(Session, "after_flush")
+def _record_project_changes(session: Session, flush_context) -> None:
+    """
+    Bump Project.version for every project this flush touched and log what
+    changed at that version — same transaction, for sync and async sessions.
+    """
+    deleted_projects = {obj.id for obj in session.deleted if isinstance(obj, Project)}
+    created_projects = {obj.id: obj.version for obj in session.new if isinstance(obj, Project)}
+
+    changes: dict[str, dict[tuple[str, str], str]] = {}
+    for op, objects in (("upsert", session.new), ("upsert", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            if op == "upsert" and obj in session.dirty and not session.is_modified(obj):
+                continue
+            key = _change_key(obj)
+            if key is None:
+                continue
+            project_id, entity, entity_id = key
+            if not project_id or project_id in deleted_projects:
+                continue
+            changes.setdefault(project_id, {})[(entity, entity_id)] = op
+
+    # Announced to /events subscribers once the transaction commits (see broker.py)
+    session.info.setdefault("touched_projects", set()).update(deleted_projects, changes)
+
+    conn = session.connection()
+    if deleted_projects:
+        conn.execute(delete(ProjectChange.__table__).where(ProjectChange.__table__.c.project_id.in_(deleted_projects)))
+    if not changes:
+        return
+
+    versions = dict(created_projects)
+    bumped = [pid for pid in changes if pid not in created_projects]
+    if bumped:
+        versions.update(conn.execute(
+            update(Project.__table__)
+            .where(Project.__table__.c.id.in_(bumped))
+            .values(version=Project.__table__.c.version + 1)
+            .returning(Project.__table__.c.id, Project.__table__.c.version)
+        ).all())
+        # Keep loaded Project objects in step without expiring them (async sessions can't lazy-refresh)
+        for pid in bumped:
+            project = session.identity_map.get(session.identity_key(Project, pid))
+            if project is not None:
+                set_committed_value(project, "version", versions[pid])
+
+    rows = [
+        {"project_id": pid, "version": versions[pid], "entity": entity, "entity_id": entity_id, "op": op, "created_at": _now()}
+        for pid, entries in changes.items() if pid in versions
+        for (entity, entity_id), op in entries.items()
+    ]
+    if rows:
+        conn.execute(insert(ProjectChange.__table__), rows)
+
+    changes_table = ProjectChange.__table__
+    for pid in changes:
+        version = versions.get(pid)
+        if version is not None and version > PROJECT_CHANGES_RETENTION and version % PROJECT_CHANGES_PRUNE_EVERY == 0:
+            conn.execute(
+                delete(changes_table)
+                .where(changes_table.c.project_id == pid, changes_table.c.version <= version - PROJECT_CHANGES_RETENTION)
+            )
@@ -1,9 +1,18 @@
+import hashlib
+import json
 import logging
-from typing import Optional
-from models import Project, ChatMessage
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple, Optional
+from context_budget import ContextBreakdown, count_tokens, message_tokens, report
+from metrics import metrics
+from models import AgentSummary, Project, ChatMessage
 
 logger = logging.getLogger("dossier.prompt")
 
+# Known agents, in the order their summaries appear in shared context
+AGENTS = ("strategy", "research", "concept", "present")
+
 shared_memory_protocol = """
 SHARED MEMORY PROTOCOL
 
@@ -359,52 +368,114 @@ Your goal is not to design for the user. Your goal is to strengthen the user's t
 """
 
 
-def build_system_prompt(project: Project, agent: str = "") -> str:
+# ── System prompt assembly ────────────────────────────────────────────────────
+#
+# Providers cache prompts by exact prefix, so each turn starts with the agent's
+# static instructions (base + persona + output format) — identical for every
+# project — and only then the project context, which changes whenever the
+# title, description or another agent's summary does.
+
+@lru_cache(maxsize=None)
+def static_system_prompt(agent: str) -> str:
+    """Base role, agent persona and output format; the same for every project."""
+    agent = (agent or "").lower()
+    parts = [base_prompt.strip()]
+    agent_prompt = _select_system_prompt(agent)
+    if agent_prompt:
+        parts.append(agent_prompt)
+    parts.append(RESEARCH_CHAT_OUTPUT_FORMAT if agent == "research" else SHARED_CHAT_OUTPUT_FORMAT)
+    return "\n\n".join(parts)
+
+
+@lru_cache(maxsize=None)
+def _static_system_tokens(agent: str) -> int:
+    return message_tokens({"role": "system", "content": static_system_prompt(agent)})
+
+
+class ProjectContext(NamedTuple):
+    """Project-specific system message for one agent, with its token counts."""
+
+    text: str                # "" when the project has no context yet
+    tokens: int
+    shared_summaries: int    # tokens of the other agents' summaries inside `text`
+
+
+PROJECT_CONTEXT_CACHE_SIZE = 512
+_project_contexts: "OrderedDict[tuple[str, str, str], ProjectContext]" = OrderedDict()
+
+
+def _project_context_digest(project: Project, agent: str) -> str:
     """
-    Build system prompt based on agent.
+    Digest of exactly what project_context() reads. Not Project.version: chat
+    messages bump that on every turn without changing the context.
     """
-    base = base_prompt.strip()
+    h = hashlib.sha256()
+    for part in (project.title or "", project.description or ""):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    for key, detail in collect_detail_summaries(project).items():
+        if key != agent:
+            h.update(f"{key}\0{detail}\0".encode("utf-8"))
+    return h.hexdigest()
+
+
+def project_context(project: Project, agent: str) -> ProjectContext:
+    """
+    Title, description and the other agents' detail summaries. Memoized by
+    a digest of those, so consecutive turns reuse the counted tokens.
+    """
+    agent = (agent or "").lower()
+    key = (project.id, agent, _project_context_digest(project, agent))
+    cached = _project_contexts.get(key)
+    if cached is not None:
+        _project_contexts.move_to_end(key)
+        metrics.incr("prompt.project_context_hits")
+        return cached
 
     context_lines: list[str] = []
     title = (project.title or "").strip()
     description = (project.description or "").strip()
-
     if title and title.lower() != "untitled":
         context_lines.append(f"Project title: {title}")
     if description:
         context_lines.append(f"Project description: {description}")
 
+    text = ""
     if context_lines:
-        context_block = "\n\nProject context:\n" + "\n".join(context_lines)
-        base += context_block
-
-    # Inject other agents' detail summaries as shared context
-    all_detail_summaries = {
-        "strategy": project.strategy_detail_summary or "",
-        "research": project.research_detail_summary or "",
-        "concept": project.concept_detail_summary or "",
-        "present": project.present_detail_summary or "",
-    }
-    current_agent = (agent or "").lower()
+        text = "Project context:\n" + "\n".join(context_lines)
+    shared = shared_summaries_block(project, agent)
+    text = (text + shared).strip()
+
+    context = ProjectContext(
+        text=text,
+        tokens=message_tokens({"role": "system", "content": text}) if text else 0,
+        shared_summaries=count_tokens(shared),
+    )
+    _project_contexts[key] = context
+    if len(_project_contexts) > PROJECT_CONTEXT_CACHE_SIZE:
+        _project_contexts.popitem(last=False)
+    metrics.incr("prompt.project_context_misses")
+    return context
+
+
+def shared_summaries_block(project: Project, agent: str) -> str:
+    """The other agents' detail summaries as a system-prompt section ("" when there are none)."""
     summary_blocks: list[str] = []
-    for key, detail in all_detail_summaries.items():
-        if key == current_agent or not detail.strip():
+    for key, detail in collect_detail_summaries(project).items():
+        if key == agent or not detail.strip():
             continue
         summary_blocks.append(f"[{key.upper()} SUMMARY]\n{detail.strip()}")
-    if summary_blocks:
-        base += "\n\nShared case file from other agents:\n" + "\n\n".join(summary_blocks)
-
-    # Add agent-specific prompt
-    agent_prompt = _select_system_prompt(agent)
-    if agent_prompt:
-        base += f"\n\n{agent_prompt}"
+    if not summary_blocks:
+        return ""
+    return "\n\nShared case file from other agents:\n" + "\n\n".join(summary_blocks)
 
-    if current_agent == "research":
-        base += f"\n\n{RESEARCH_CHAT_OUTPUT_FORMAT}"
-    else:
-        base += f"\n\n{SHARED_CHAT_OUTPUT_FORMAT}"
 
-    return base
+def collect_detail_summaries(project: Project) -> dict[str, str]:
+    """Every agent's detail summary from `project.agent_summaries`, in AGENTS order."""
+    details = {agent: "" for agent in AGENTS}
+    for row in project.agent_summaries:
+        details[row.agent] = row.detail_summary or ""
+    return details
 
 
 def _select_system_prompt(agent: str) -> str:
@@ -504,9 +575,18 @@ def build_summary_prompt(
     project: Project,
     agent_history: list[ChatMessage],
     all_detail_summaries: dict[str, str],
+    previous: Optional[AgentSummary] = None,
+    chunk_notes: Optional[list[str]] = None,
 ) -> str:
     """Build a single user prompt string for the summarization call.
 
+    With `previous` (the agent's last generated summary), `agent_history` is
+    only the turns after its watermark and the model updates that summary
+    instead of re-reading the whole transcript.
+
+    With `chunk_notes` (see summarization.py), the transcript was too long for
+    one prompt and is replaced by notes on its consecutive parts.
+
     The model must return **only** JSON with the following exact shape:
 
     {
@@ -543,12 +623,33 @@ def build_summary_prompt(
         role = msg.role.upper()
         history_lines.append(f"[{role}] {msg.content}")
     history_block = "\n".join(history_lines) if history_lines else "(no prior conversation for this agent)"
+    history_title = "Current agent conversation transcript (most recent last)"
+    if chunk_notes:
+        history_block = "\n\n".join(
+            f"[PART {i} OF {len(chunk_notes)}]\n{notes}" for i, notes in enumerate(chunk_notes, start=1)
+        )
+        history_title = "Notes on the current agent conversation, one per consecutive part (oldest first)"
+    if previous is not None:
+        previous_json = json.dumps({
+            "summary": previous.summary or "",
+            "problem_statment": previous.problem_statement or "",
+            "assumptions": previous.assumptions or "",
+            "detail_summary": previous.detail_summary or "",
+        }, ensure_ascii=False, indent=2)
+        history_title = (
+            "Previous summary of this agent's conversation (covers every turn before the new ones):\n"
+            f"{previous_json}\n\n"
+            + ("Notes on the new turns since that summary, one per consecutive part (oldest first)"
+               if chunk_notes else "New turns since that summary (most recent last)")
+        )
 
     instructions = """
 You are going to summarize the conversation for this one agent.
 
 1. Read the project context.
-2. Read the current agent's conversation transcript.
+2. Read the current agent's conversation transcript. If a previous summary is given, the transcript
+   only holds the new turns: update that summary with them, keeping earlier points unless the new
+   turns revise them.
 3. Consider any detail summaries from the other agents as additional context.
 4. Produce a **compact but information-dense** JSON object capturing the essentials.
 
@@ -577,33 +678,109 @@ For `detail_summary`, use the same hierarchical Markdown as chat replies (ChatGP
         f"{header}\n\n"
         f"Project context:\n{project_block}\n\n"
         f"Other agents' detail summaries (may be empty):\n{other_summary_block}\n\n"
-        f"Current agent conversation transcript (most recent last):\n{history_block}\n\n"
+        f"{history_title}:\n{history_block}\n\n"
         f"{instructions}\n"
     )
 
     return full_prompt
 
 
+# ── Map step for transcripts too long to summarize in one call ────────────────
+
+def build_chunk_notes_prompt(agent: str, transcript: str, part: int, parts: int) -> str:
+    """Prompt for notes on one part of a long transcript; the notes later feed build_summary_prompt."""
+    return f"""
+You are helping summarize a very long conversation between a user and the {(agent or "").upper() or "design"} agent.
+Below is part {part} of {parts} of the transcript, oldest turns first.
+
+{transcript}
+
+Write dense notes on this part only: decisions, constraints, problem framing, assumptions,
+open questions, named references and sources, and anything the user asked to keep. Keep the
+user's own wording for key phrases. Drop pleasantries and repetition. Use short Markdown bullets
+grouped under #### headings; stay under 600 words. Respond with the notes only.
+""".strip()
+
+
+def build_notes_merge_prompt(agent: str, notes: list[str]) -> str:
+    """Prompt that condenses the notes of several consecutive parts into one set of notes."""
+    joined = "\n\n".join(f"[PART {i}]\n{n}" for i, n in enumerate(notes, start=1))
+    return f"""
+Below are notes on consecutive parts of a long conversation with the {(agent or "").upper() or "design"} agent, oldest first.
+
+{joined}
+
+Merge them into one set of notes covering all of these parts. Where a later part revises an
+earlier decision, keep the later one. Use short Markdown bullets grouped under #### headings;
+stay under 800 words. Respond with the notes only.
+""".strip()
+
+
+# ── Rolling summary of older chat turns ───────────────────────────────────────
+
+EARLIER_TURNS_HEADER = (
+    "Summary of the earlier conversation with this agent "
+    "(older turns are not shown verbatim; treat this as what was already discussed):\n"
+)
+
+
+def build_rolling_summary_prompt(previous_summary: Optional[str], turns: list[ChatMessage]) -> str:
+    """Prompt that extends the rolling summary with turns about to drop out of the verbatim history."""
+    transcript = "\n".join(f"[{msg.role.upper()}] {msg.content}" for msg in turns)
+    previous = (previous_summary or "").strip() or "(none yet)"
+    return f"""
+You maintain a running summary of a long conversation between a user and one design-thinking agent.
+The oldest turns are being removed from the agent's context; fold them into the summary.
+
+Current summary:
+{previous}
+
+Turns to fold in (oldest first):
+{transcript}
+
+Rewrite the summary so it also covers these turns. Keep decisions, constraints, open questions,
+named references and anything the user asked the agent to remember. Drop pleasantries and
+repetition. Use short Markdown bullets grouped under #### headings; stay under 500 words.
+Respond with the summary only.
+""".strip()
+
+
 def build_messages(
     new_message: str,
     project: Project,
     history: list[ChatMessage],
     agent: str = "",
     image_url: Optional[str] = None,
+    earlier_summary: Optional[str] = None,
 ) -> list[dict]:
     """
     Build the full OpenAI messages array:
-      - system: role + project context + agent prompt
+      - system: base role + agent prompt + output format (static per agent,
+        so it stays a cacheable prefix)
+      - system: project context and the other agents' summaries, when there are any
+      - system: rolling summary of older turns, when the history was budgeted
+        (see context_budget.plan_history — `history` is then only the recent turns)
       - user/assistant: real alternating turns from DB history
       - user: the new message (with optional image)
-    Logs the full payload for debugging.
+    Logs the token breakdown, and the full payload for debugging.
     """
-    system_prompt = build_system_prompt(project, agent)
-
-    messages: list[dict] = [{"role": "system", "content": system_prompt}]
+    breakdown = ContextBreakdown(agent=(agent or "").lower())
+    messages: list[dict] = [{"role": "system", "content": static_system_prompt(breakdown.agent)}]
+    breakdown.system = _static_system_tokens(breakdown.agent)
+
+    context = project_context(project, breakdown.agent)
+    if context.text:
+        messages.append({"role": "system", "content": context.text})
+        breakdown.system += context.tokens - context.shared_summaries
+        breakdown.shared_summaries = context.shared_summaries
+    if earlier_summary and earlier_summary.strip():
+        messages.append({"role": "system", "content": EARLIER_TURNS_HEADER + earlier_summary.strip()})
+        breakdown.rolling_summary = message_tokens(messages[-1])
     for msg in history:
         if msg.content and msg.content.strip():
             messages.append({"role": msg.role, "content": msg.content})
+            breakdown.history += message_tokens(messages[-1])
+            breakdown.history_turns += 1
 
     # Build the final user message — multimodal if an image was provided
     if image_url:
@@ -617,6 +794,8 @@ def build_messages(
         messages.append({"role": "user", "content": user_content})
     else:
         messages.append({"role": "user", "content": new_message})
+    breakdown.new_message = message_tokens(messages[-1])
+    report(breakdown)
 
     # ── Debug log ──────────────────────────────────────────────────────────────
     history_log = "\n".join(
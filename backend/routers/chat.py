@@ -1,26 +1,53 @@
 import asyncio
 import json
-import os
+import logging
+import time
+import uuid
+import anyio
 import httpx
-from typing import Optional, List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Dict, List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only, selectinload
 from datetime import datetime
-from openai import AsyncOpenAI, OpenAI, OpenAIError
-
-from database import get_db
-from models import Project, ChatMessage, DossiBoardItem
-from prompt import build_messages, build_summary_prompt, base_prompt
+from openai import AsyncOpenAI, OpenAIError
+
+from conditional import not_modified
+from database import AsyncSessionLocal, get_db, get_async_db
+from llm import get_openai_client, prompt_cache_key, record_usage
+from llm_scheduler import estimate_tokens, scheduler, upstream_error
+from context_budget import plan_history
+from jobs import PermanentJobError, enqueue, job_handler, wake_workers
+from metrics import metrics
+from models import AgentContextSummary, AgentSummary, Project, ChatMessage, DossiBoardItem, Job
+from prompt import (
+    AGENTS, build_messages, build_rolling_summary_prompt, build_summary_prompt, base_prompt, collect_detail_summaries,
+)
+from singleflight import flights
+from sse import SSE_HEADERS, sse_event
+from streaming_json import IncrementalObjectParser
+from summarization import summarize_in_chunks
+
+logger = logging.getLogger("dossier.chat")
 
 router = APIRouter()
 
+# Stored on the user message when a turn fails for a reason other than the model call
+TURN_ERROR = "Something went wrong while generating the reply."
+
 
 class MessageOut(BaseModel):
     id: str
+    seq: int  # per-project order; pass as `before`/`after` to page through history
     role: str
     content: str
     image_url: Optional[str] = None
+    status: str = "complete"     # user turns: "pending" until the reply is saved, "failed" if the model call failed
+    error: Optional[str] = None  # why a failed turn failed
     created_at: datetime
 
     model_config = {"from_attributes": True}
@@ -122,7 +149,7 @@ async def _fetch_thumbnail_url(url: str) -> str:
 async def _save_references_to_dossi_board(
     project_id: str,
     references: List[ResearchReference],
-    db: Session,
+    db: AsyncSession,
 ) -> None:
     """Persist research references as website items in the dossi board."""
     tasks = [_fetch_thumbnail_url(ref.url) for ref in references]
@@ -130,10 +157,12 @@ async def _save_references_to_dossi_board(
 
     for ref, thumbnail in zip(references, thumbnails):
         # Skip duplicates already saved for this project
-        existing = db.query(DossiBoardItem).filter(
-            DossiBoardItem.project_id == project_id,
-            DossiBoardItem.source_url == ref.url,
-        ).first()
+        existing = await db.scalar(
+            select(DossiBoardItem).where(
+                DossiBoardItem.project_id == project_id,
+                DossiBoardItem.source_url == ref.url,
+            ).limit(1)
+        )
         if existing:
             continue
 
@@ -148,7 +177,26 @@ async def _save_references_to_dossi_board(
         )
         db.add(item)
 
-    db.flush()
+    await db.flush()
+
+
+def _citation_from_annotation(a: Any) -> Optional[CitationOut]:
+    """CitationOut for a url_citation annotation (SDK object or plain dict), else None."""
+    if getattr(a, "type", None) == "url_citation":
+        return CitationOut(
+            url=getattr(a, "url", "") or (a.get("url") if isinstance(a, dict) else ""),
+            title=getattr(a, "title", None) or (a.get("title") if isinstance(a, dict) else None),
+            start_index=getattr(a, "start_index", None) or (a.get("start_index") if isinstance(a, dict) else None),
+            end_index=getattr(a, "end_index", None) or (a.get("end_index") if isinstance(a, dict) else None),
+        )
+    if isinstance(a, dict) and a.get("type") == "url_citation":
+        return CitationOut(
+            url=a.get("url", ""),
+            title=a.get("title"),
+            start_index=a.get("start_index"),
+            end_index=a.get("end_index"),
+        )
+    return None
 
 
 def _extract_citations_from_response_output(output: Any) -> Optional[List[CitationOut]]:
@@ -165,163 +213,403 @@ def _extract_citations_from_response_output(output: Any) -> Optional[List[Citati
                 continue
             ann = getattr(block, "annotations", None) or []
             for a in ann:
-                if getattr(a, "type", None) == "url_citation":
-                    citations.append(CitationOut(
-                        url=getattr(a, "url", "") or (a.get("url") if isinstance(a, dict) else ""),
-                        title=getattr(a, "title", None) or (a.get("title") if isinstance(a, dict) else None),
-                        start_index=getattr(a, "start_index", None) or (a.get("start_index") if isinstance(a, dict) else None),
-                        end_index=getattr(a, "end_index", None) or (a.get("end_index") if isinstance(a, dict) else None),
-                    ))
-                elif isinstance(a, dict) and a.get("type") == "url_citation":
-                    citations.append(CitationOut(
-                        url=a.get("url", ""),
-                        title=a.get("title"),
-                        start_index=a.get("start_index"),
-                        end_index=a.get("end_index"),
-                    ))
+                citation = _citation_from_annotation(a)
+                if citation is not None:
+                    citations.append(citation)
     return citations if citations else None
 
 
-
-@router.get("/projects/{project_id}/messages", response_model=List[MessageOut])
-def get_messages(project_id: str, agent: Optional[str] = None, db: Session = Depends(get_db)):
-    project = db.get(Project, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    if agent is None:
-        return project.messages
-
-    return [m for m in project.messages if m.agent == agent]
+def _agent_history_query(project_id: str, agent: str):
+    """
+    One agent's completed turns, oldest first, loading only what the prompt
+    builders read. Pending and failed user messages have no reply to pair with.
+    """
+    return (
+        select(ChatMessage)
+        .where(ChatMessage.project_id == project_id, ChatMessage.agent == agent, ChatMessage.status == "complete")
+        .order_by(ChatMessage.seq)
+        .options(load_only(ChatMessage.seq, ChatMessage.role, ChatMessage.content, raiseload=True))
+    )
 
 
-@router.post("/projects/{project_id}/messages", response_model=ChatResponse)
-async def send_message(
+async def _history_for_prompt(
+    db: AsyncSession,
+    client: AsyncOpenAI,
     project_id: str,
-    body: SendMessageRequest,
-    db: Session = Depends(get_db),
-):
-    project = db.get(Project, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(
-            status_code=503,
-            detail="OpenAI API key not configured. Add OPENAI_API_KEY to your .env file.",
-        )
+    agent: str,
+    history: List[ChatMessage],
+) -> tuple[List[ChatMessage], Optional[str]]:
+    """
+    Fit an agent's history into its token budget: the turns to send verbatim,
+    plus the rolling summary standing in for the older ones. Extends the
+    cached summary (in this session's transaction) when turns have to be folded.
+    """
+    agent_key = (agent or "").lower()
+    cached = await db.get(AgentContextSummary, (project_id, agent_key))
+    plan = plan_history(history, agent_key, cached.through_seq if cached else 0)
+    if not plan.fold:
+        return plan.recent, cached.summary if cached else None
+
+    messages = [
+        {"role": "system", "content": base_prompt.strip()},
+        {"role": "user", "content": build_rolling_summary_prompt(cached.summary if cached else None, plan.fold)},
+    ]
+    response = await scheduler.call(
+        project_id, estimate_tokens(messages, 1200),
+        client.chat.completions.create,
+        model="gpt-5.2",
+        messages=messages,
+        max_completion_tokens=1200,
+        temperature=0.3,
+    )
+    record_usage("rolling_summary", response.usage)
+    summary = (response.choices[0].message.content or "").strip()
+    if cached is None:
+        cached = AgentContextSummary(project_id=project_id, agent=agent_key)
+        db.add(cached)
+    cached.summary = summary
+    cached.through_seq = plan.fold[-1].seq
+    metrics.incr("context.folds")
+    metrics.incr("context.folded_turns", len(plan.fold))
+    return plan.recent, summary
+
+
+async def _next_message_seq(db: AsyncSession, project_id: str) -> int:
+    """Atomically allocate the next per-project ChatMessage.seq."""
+    return await db.scalar(
+        update(Project)
+        .where(Project.id == project_id)
+        .values(message_seq=Project.message_seq + 1)
+        .returning(Project.message_seq)
+    )
 
-    # Snapshot history for this agent before saving the new message
-    history = [m for m in project.messages if m.agent == body.agent]
 
-    # Save the user message — if image-only, store a placeholder so content is non-empty
+async def _save_user_message(db: AsyncSession, project_id: str, body: SendMessageRequest) -> ChatMessage:
+    """Commit the user side of a turn as "pending", in its own short transaction."""
+    # If image-only, store a placeholder so content is non-empty
     stored_content = body.content.strip()
     if not stored_content and body.image_url:
         stored_content = "[Image]"
     user_msg = ChatMessage(
         project_id=project_id,
+        seq=await _next_message_seq(db, project_id),
         role="user",
         content=stored_content,
         agent=body.agent,
         image_url=body.image_url,
+        status="pending",
     )
     db.add(user_msg)
-    db.flush()
+    await db.commit()
+    return user_msg
+
 
+async def _finish_turn(
+    db: AsyncSession,
+    user_msg: ChatMessage,
+    reply_text: str,
+    error: Optional[str] = None,
+    reply_id: Optional[str] = None,
+) -> Optional[ChatMessage]:
+    """
+    Second transaction of a turn: save the assistant reply (with id
+    `reply_id`, if given) and mark the user message complete. With no reply
+    text the user message is marked failed instead (kept, with the reason)
+    and None is returned.
+    """
+    if not reply_text:
+        user_msg.status = "failed"
+        user_msg.error = error or "Model returned an empty response."
+        await db.commit()
+        metrics.incr("chat.failed_turns")
+        return None
+    user_msg.status = "complete"
+    assistant_msg = ChatMessage(
+        id=reply_id or str(uuid.uuid4()),
+        project_id=user_msg.project_id,
+        seq=await _next_message_seq(db, user_msg.project_id),
+        role="assistant",
+        content=reply_text,
+        agent=user_msg.agent,
+    )
+    db.add(assistant_msg)
+    await db.commit()
+    return assistant_msg
+
+
+async def _generate_reply(
+    db: AsyncSession,
+    client: AsyncOpenAI,
+    project: Project,
+    agent: str,
+    content: str,
+    image_url: Optional[str],
+    history: List[ChatMessage],
+) -> tuple[str, Optional[List[CitationOut]]]:
+    """
+    The model side of a turn: fit the history into its budget (committing a
+    newly folded rolling summary), build the prompt and call the model.
+    Returns the reply text and, for Research, its citations.
+    """
+    recent, earlier_summary = await _history_for_prompt(db, client, project.id, agent, history)
+    await db.commit()
     # Build properly structured OpenAI messages (system + alternating turns + new message)
     openai_messages = build_messages(
-        new_message=body.content,
+        new_message=content,
         project=project,
-        history=history,
-        agent=body.agent,
-        image_url=body.image_url,
+        history=recent,
+        agent=agent,
+        image_url=image_url,
+        earlier_summary=earlier_summary,
+    )
+    cache_key = prompt_cache_key(project.id, agent)
+    if (agent or "").lower() == "research":
+        return await _research_reply(client, project.id, openai_messages, cache_key)
+
+    # Chat Completions for non-Research agents
+    response = await scheduler.call(
+        project.id, estimate_tokens(openai_messages, 3000),
+        client.chat.completions.create,
+        model="gpt-5.2",
+        messages=openai_messages,
+        max_completion_tokens=3000,
+        temperature=0.7,
+        prompt_cache_key=cache_key,
     )
+    record_usage("chat", response.usage)
+    return (response.choices[0].message.content or "").strip(), None
+
+
+RESEARCH_MAX_OUTPUT_TOKENS = 10000
+
+
+def _research_request(openai_messages: List[dict], cache_key: str) -> Dict[str, Any]:
+    """Responses API arguments for a Research turn: gpt-5 with the web_search tool."""
+    # SDK version does not support response_format yet; we enforce
+    # the JSON shape post-hoc via Pydantic validation instead.
+    return {
+        "model": "gpt-5",
+        "tools": [{"type": "web_search"}],
+        "input": _messages_to_responses_input(openai_messages),
+        "max_output_tokens": RESEARCH_MAX_OUTPUT_TOKENS,
+        "prompt_cache_key": cache_key,
+    }
+
+
+def _format_research_reply(
+    answer: str,
+    references: List[ResearchReference],
+    citations: Optional[List[CitationOut]],
+) -> tuple[str, Optional[List[CitationOut]]]:
+    """
+    Stored Research reply: the answer plus References blocks for the model's
+    references and the web-search citations. Returns the text and the
+    citations deduplicated by URL.
+    """
+    # Build final answer + inline reference section
+    reply_text = (answer or "").strip()
+    if references:
+        ref_lines = ["References:"]
+        for idx, ref in enumerate(references, start=1):
+            label = ref.title or ref.url
+            note = f" – {ref.note}" if ref.note else ""
+            ref_lines.append(f"{idx}. [{label}]({ref.url}){note}")
+        reply_text = reply_text + "\n\n" + "\n".join(ref_lines)
+
+    # Deduplicate citations by URL and append as a References block so they persist in the DB
+    if citations:
+        seen: set = set()
+        unique_citations: List[CitationOut] = []
+        for c in citations:
+            if c.url not in seen:
+                seen.add(c.url)
+                unique_citations.append(c)
+        citations = unique_citations
+
+        ref_lines = ["References:"]
+        for idx, c in enumerate(citations, start=1):
+            label = c.title or c.url
+            ref_lines.append(f"{idx}. [{label}]({c.url})")
+        reply_text = reply_text + "\n\n" + "\n".join(ref_lines)
+
+    # References are saved manually by the user via the + button in the chat UI
+    return reply_text, citations or None
+
+
+def _research_reply_from_response(response: Any) -> tuple[str, Optional[List[CitationOut]]]:
+    """Parse a finished Responses API result into the stored reply text and citations."""
+    record_usage("research", getattr(response, "usage", None))
+    raw_text = (response.output_text or "").strip()
+    try:
+        parsed = ResearchAgentResult.model_validate(json.loads(raw_text))
+    except (json.JSONDecodeError, ValidationError):
+        parsed = ResearchAgentResult(answer=raw_text, references=[])
+    output = getattr(response, "output", None)
+    citations = _extract_citations_from_response_output(output) if output is not None else None
+    return _format_research_reply(parsed.answer, parsed.references, citations)
+
+
+async def _research_reply(
+    client: AsyncOpenAI, project_id: str, openai_messages: List[dict], cache_key: str,
+) -> tuple[str, Optional[List[CitationOut]]]:
+    """Research agent turn in one round trip (POST /messages)."""
+    response = await scheduler.call(
+        project_id, estimate_tokens(openai_messages, RESEARCH_MAX_OUTPUT_TOKENS),
+        client.responses.create, **_research_request(openai_messages, cache_key),
+    )
+    return _research_reply_from_response(response)
+
+
+class _ResearchStream:
+    """
+    One streamed Research turn. `frames()` relays the Responses API event
+    stream as SSE: web-search progress, the `answer` text as it is generated
+    (picked out of the JSON by an incremental parser), and each reference and
+    url_citation as soon as it is complete. `reply()` is what gets stored —
+    the full result once the response completed, otherwise what has arrived.
+    """
+
+    def __init__(self):
+        self.parser = IncrementalObjectParser(text_field="answer", items_field="references")
+        self.references: List[ResearchReference] = []
+        self.citations: List[CitationOut] = []
+        self.final: Optional[tuple[str, Optional[List[CitationOut]]]] = None
+
+    async def frames(
+        self, client: AsyncOpenAI, project_id: str, openai_messages: List[dict], cache_key: str,
+    ) -> AsyncIterator[str]:
+        async with scheduler.stream(
+            project_id, estimate_tokens(openai_messages, RESEARCH_MAX_OUTPUT_TOKENS),
+            client.responses.create, **_research_request(openai_messages, cache_key), stream=True,
+        ) as events:
+            async for frame in self._relay(events):
+                yield frame
+
+    async def _relay(self, events: Any) -> AsyncIterator[str]:
+        async for event in events:
+            kind = event.type
+            if kind.startswith("response.web_search_call."):
+                # in_progress → searching → completed
+                yield sse_event("search", {"id": event.item_id, "status": kind.rsplit(".", 1)[1]})
+            elif kind == "response.output_item.done" and getattr(event.item, "type", None) == "web_search_call":
+                query = getattr(getattr(event.item, "action", None), "query", None)
+                if query:
+                    yield sse_event("search", {"id": event.item.id, "status": "completed", "query": query})
+            elif kind == "response.output_text.delta":
+                for part, value in self.parser.feed(event.delta):
+                    if part == "text":
+                        yield sse_event("delta", {"text": value})
+                        continue
+                    try:
+                        ref = ResearchReference.model_validate(value)
+                    except ValidationError:
+                        continue
+                    self.references.append(ref)
+                    yield sse_event("reference", ref)
+            elif kind == "response.output_text.annotation.added":
+                citation = _citation_from_annotation(event.annotation)
+                if citation is not None and all(c.url != citation.url for c in self.citations):
+                    self.citations.append(citation)
+                    yield sse_event("citation", citation)
+            elif kind in ("response.completed", "response.incomplete"):
+                self.final = _research_reply_from_response(event.response)
+            elif kind in ("response.failed", "error"):
+                error = getattr(getattr(event, "response", None), "error", None) or event
+                raise OpenAIError(getattr(error, "message", None) or "Research response failed.")
+
+    def reply(self) -> tuple[str, Optional[List[CitationOut]]]:
+        if self.final is not None:
+            return self.final
+        return _format_research_reply(self.parser.text, self.references, self.citations)
+
+
+@router.get("/projects/{project_id}/messages", response_model=List[MessageOut])
+def get_messages(
+    project_id: str,
+    response: Response,
+    agent: Optional[str] = None,
+    before: Optional[int] = Query(None, description="Return messages with seq lower than this cursor"),
+    after: Optional[int] = Query(None, description="Return messages with seq higher than this cursor"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Message history in seq order (oldest first).
+
+    Without `limit` the full history is returned. With `limit` (and no `after`)
+    the newest page is returned; pass the lowest `seq` of a page as `before` to
+    scroll back, or the highest `seq` seen as `after` to fetch newer messages.
+    """
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Pass either `before` or `after`, not both")
+    cached = not_modified(db, project_id, if_none_match, response)
+    if cached:
+        return cached
+
+    query = (
+        select(ChatMessage)
+        .where(ChatMessage.project_id == project_id)
+        .options(load_only(
+            ChatMessage.seq, ChatMessage.role, ChatMessage.content, ChatMessage.image_url, ChatMessage.status,
+            ChatMessage.error, ChatMessage.created_at, raiseload=True,
+        ))
+    )
+    if agent is not None:
+        query = query.where(ChatMessage.agent == agent)
+    if before is not None:
+        query = query.where(ChatMessage.seq < before)
+    if after is not None:
+        query = query.where(ChatMessage.seq > after)
+
+    if limit is None or after is not None:
+        query = query.order_by(ChatMessage.seq).limit(limit)
+        return db.scalars(query).all()
+
+    # Newest page first from the index, then flip back to oldest-first
+    page = db.scalars(query.order_by(ChatMessage.seq.desc()).limit(limit)).all()
+    return list(reversed(page))
+
+
+@router.post("/projects/{project_id}/messages", response_model=ChatResponse)
+async def send_message(
+    project_id: str,
+    body: SendMessageRequest,
+    db: AsyncSession = Depends(get_async_db),
+    client: AsyncOpenAI = Depends(get_openai_client),
+):
+    project = await db.get(Project, project_id, options=[selectinload(Project.agent_summaries)])
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # Snapshot history for this agent before saving the new message
+    history = (await db.scalars(_agent_history_query(project_id, body.agent))).all()
+
+    user_msg = await _save_user_message(db, project_id, body)
+    user_msg_id = user_msg.id
 
     use_web_search = (body.agent or "").lower() == "research"
     citations: Optional[List[CitationOut]] = None
     reply_text: str = ""
+    failure: Optional[OpenAIError] = None
 
+    # No write transaction is open while the model works — other writers are not blocked
     try:
-        if use_web_search:
-            # Official Responses API with web_search tool (model="gpt-5", tools=[{"type": "web_search"}])
-            input_list = _messages_to_responses_input(openai_messages)
-            sync_client = OpenAI(api_key=api_key)
-
-            def _create_response():
-                # SDK version does not support response_format yet; we enforce
-                # the JSON shape post-hoc via Pydantic validation instead.
-                return sync_client.responses.create(
-                    model="gpt-5",
-                    tools=[{"type": "web_search"}],
-                    input=input_list,
-                    max_output_tokens=10000,
-                )
-
-            response = await asyncio.to_thread(_create_response)
-            raw_text = (response.output_text or "").strip()
-            try:
-                parsed = ResearchAgentResult.model_validate(json.loads(raw_text))
-            except (json.JSONDecodeError, ValidationError):
-                parsed = ResearchAgentResult(answer=raw_text, references=[])
-
-            # Build final answer + inline reference section
-            answer_text = (parsed.answer or "").strip()
-            if parsed.references:
-                ref_lines = ["References:"]
-                for idx, ref in enumerate(parsed.references, start=1):
-                    label = ref.title or ref.url
-                    note = f" – {ref.note}" if ref.note else ""
-                    ref_lines.append(f"{idx}. [{label}]({ref.url}){note}")
-                answer_text = answer_text + "\n\n" + "\n".join(ref_lines)
-
-            reply_text = answer_text
-            output = getattr(response, "output", None)
-            if output is not None:
-                citations = _extract_citations_from_response_output(output)
-
-            # Deduplicate citations by URL and append as a References block so they persist in the DB
-            if citations:
-                seen: set = set()
-                unique_citations: List[CitationOut] = []
-                for c in citations:
-                    if c.url not in seen:
-                        seen.add(c.url)
-                        unique_citations.append(c)
-                citations = unique_citations
-
-                ref_lines = ["References:"]
-                for idx, c in enumerate(citations, start=1):
-                    label = c.title or c.url
-                    ref_lines.append(f"{idx}. [{label}]({c.url})")
-                reply_text = reply_text + "\n\n" + "\n".join(ref_lines)
-
-            # References are saved manually by the user via the + button in the chat UI
-        else:
-            # Chat Completions for non-Research agents
-            client = AsyncOpenAI(api_key=api_key)
-            response = await client.chat.completions.create(
-                model="gpt-5.2",
-                messages=openai_messages,
-                max_completion_tokens=3000,
-                temperature=0.7,
-            )
-            msg = response.choices[0].message
-            reply_text = (msg.content or "").strip()
+        reply_text, citations = await _generate_reply(db, client, project, body.agent, body.content, body.image_url, history)
     except OpenAIError as e:
-        db.rollback()
-        raise HTTPException(status_code=502, detail=str(e))
-
-    if not reply_text:
-        db.rollback()
-        raise HTTPException(status_code=502, detail="Model returned an empty response.")
-
-    # Save the assistant reply
-    assistant_msg = ChatMessage(project_id=project_id, role="assistant", content=reply_text, agent=body.agent)
-    db.add(assistant_msg)
-    db.commit()
-    db.refresh(user_msg)
-    db.refresh(assistant_msg)
+        failure = e
+    except Exception:
+        # Never leave the turn pending: mark it failed, then surface the error. The
+        # request's session may hold a half-done write (and its lock), so drop that first.
+        await db.rollback()
+        await _finish_turn_in_new_session(user_msg_id, "", TURN_ERROR)
+        raise
+
+    assistant_msg = await _finish_turn(db, user_msg, reply_text, str(failure) if failure else None)
+    if assistant_msg is None:
+        if failure is not None:
+            raise upstream_error(failure, user_msg.error)
+        raise HTTPException(status_code=502, detail=user_msg.error)
 
     return ChatResponse(
         user_message=user_msg,
@@ -331,6 +619,148 @@ async def send_message(
     )
 
 
+class StreamDoneOut(BaseModel):
+    """Final event of a streamed turn: the rows as saved."""
+
+    user_message: MessageOut
+    assistant_message: MessageOut
+    citations: Optional[List[CitationOut]] = None
+    web_search_used: bool = False
+    complete: bool = True  # False when the client went away and a partial reply was saved
+
+
+async def _finish_turn_in_new_session(
+    user_msg_id: str,
+    reply_text: str,
+    error: Optional[str] = None,
+) -> tuple[Optional[ChatMessage], Optional[ChatMessage]]:
+    """
+    _finish_turn on a fresh session — the request's may already be closed
+    when the stream ends, or be mid-way through a failed transaction.
+    Returns the user message as saved and the reply.
+    """
+    async with AsyncSessionLocal() as db:
+        user_msg = await db.get(ChatMessage, user_msg_id)
+        if user_msg is None:  # project deleted mid-stream
+            return None, None
+        return user_msg, await _finish_turn(db, user_msg, reply_text, error)
+
+
+@router.post("/projects/{project_id}/messages/stream")
+async def send_message_stream(
+    project_id: str,
+    body: SendMessageRequest,
+    db: AsyncSession = Depends(get_async_db),
+    client: AsyncOpenAI = Depends(get_openai_client),
+):
+    """
+    Same turn as POST /messages, streamed as Server-Sent Events:
+
+        user_message   the saved user message
+        delta          {"text": ...} — reply text as the model produces it
+        search         {"id", "status", "query"?} — Research web-search progress
+        reference      ResearchReference — Research, as each one completes
+        citation       CitationOut — Research url_citation annotations
+        done           StreamDoneOut — saved user + assistant messages
+        error          {"detail": ...} — the model call failed; the user message is kept as failed
+
+    The user message is committed (pending) before the model is called, so no
+    write transaction stays open for the length of the stream. The assistant
+    message is saved once at the end — or, if the client disconnects
+    mid-reply, with whatever text had arrived.
+    """
+    project = await db.get(Project, project_id, options=[selectinload(Project.agent_summaries)])
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    history = (await db.scalars(_agent_history_query(project_id, body.agent))).all()
+
+    user_msg = await _save_user_message(db, project_id, body)
+    user_msg_id = user_msg.id
+    try:
+        recent, earlier_summary = await _history_for_prompt(db, client, project_id, body.agent, history)
+        await db.commit()  # a newly folded rolling summary
+        openai_messages = build_messages(
+            new_message=body.content,
+            project=project,
+            history=recent,
+            agent=body.agent,
+            image_url=body.image_url,
+            earlier_summary=earlier_summary,
+        )
+    except OpenAIError as e:
+        await _finish_turn_in_new_session(user_msg_id, "", str(e))
+        raise upstream_error(e)
+    except Exception:
+        await db.rollback()
+        await _finish_turn_in_new_session(user_msg_id, "", TURN_ERROR)
+        raise
+    use_web_search = (body.agent or "").lower() == "research"
+    cache_key = prompt_cache_key(project_id, body.agent)
+
+    async def stream():
+        parts: List[str] = []
+        research = _ResearchStream() if use_web_search else None
+        citations: Optional[List[CitationOut]] = None
+        error: Optional[str] = None
+        complete = False
+        try:
+            yield sse_event("user_message", MessageOut.model_validate(user_msg))
+            if research is not None:
+                async for frame in research.frames(client, project_id, openai_messages, cache_key):
+                    yield frame
+            else:
+                async with scheduler.stream(
+                    project_id, estimate_tokens(openai_messages, 3000),
+                    client.chat.completions.create,
+                    model="gpt-5.2",
+                    messages=openai_messages,
+                    max_completion_tokens=3000,
+                    temperature=0.7,
+                    prompt_cache_key=cache_key,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                ) as chunks:
+                    async for chunk in chunks:
+                        if getattr(chunk, "usage", None) is not None:  # final chunk, no choices
+                            record_usage("chat", chunk.usage)
+                        text = chunk.choices[0].delta.content if chunk.choices else None
+                        if text:
+                            parts.append(text)
+                            yield sse_event("delta", {"text": text})
+            complete = True
+        except OpenAIError as e:
+            error = str(e)
+            parts.clear()
+            research = None
+        except Exception:
+            # Not the model's fault, but the turn still fails rather than saving a partial reply
+            logger.exception("streamed turn failed for project %s", project_id)
+            error = TURN_ERROR
+            parts.clear()
+            research = None
+        finally:
+            if research is not None:
+                reply_text, citations = research.reply()
+                parts = [reply_text]
+            # Runs on client disconnect too: shield the save from the cancelled request scope
+            with anyio.CancelScope(shield=True):
+                saved_user_msg, assistant_msg = await _finish_turn_in_new_session(user_msg.id, "".join(parts).strip(), error)
+
+        if assistant_msg is None:
+            yield sse_event("error", {"detail": saved_user_msg.error if saved_user_msg else "Project not found"})
+            return
+        yield sse_event("done", StreamDoneOut(
+            user_message=saved_user_msg,
+            assistant_message=assistant_msg,
+            citations=citations,
+            web_search_used=use_web_search,
+            complete=complete,
+        ))
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 class SummarizeRequest(BaseModel):
     agent: str
 
@@ -340,103 +770,342 @@ class SummaryOut(BaseModel):
     problem_statment: str
     assumptions: str
     detail_summary: str
+    cached: bool = False   # no new turns since the stored summary; returned without an LLM call
 
 
-@router.post("/projects/{project_id}/summary", response_model=SummaryOut)
-async def summarize_agent(
-    project_id: str,
-    body: SummarizeRequest,
-    db: Session = Depends(get_db),
-):
-    project = db.get(Project, project_id)
+def _summary_out(row: AgentSummary, cached: bool = False) -> SummaryOut:
+    return SummaryOut(
+        summary=row.summary or "",
+        problem_statment=row.problem_statement or "",
+        assumptions=row.assumptions or "",
+        detail_summary=row.detail_summary or "",
+        cached=cached,
+    )
+
+
+async def _summary_watermark(db: AsyncSession, project_id: str, agent: str) -> int:
+    """Seq of the agent's latest complete turn — what a summary made now would cover."""
+    return await db.scalar(
+        select(func.max(ChatMessage.seq))
+        .where(ChatMessage.project_id == project_id, ChatMessage.agent == agent, ChatMessage.status == "complete")
+    ) or 0
+
+
+async def run_summary(db: AsyncSession, client: AsyncOpenAI, project_id: str, agent: str) -> SummaryOut:
+    """
+    Summarize one agent's conversation. AgentSummary.through_seq marks the last
+    turn the stored summary covers: with no newer turns it is returned as is,
+    otherwise only the newer turns are sent alongside the previous summary.
+    """
+    project = await db.get(Project, project_id, options=[selectinload(Project.agent_summaries)])
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    agent = body.agent
+    agent_lower = (agent or "").lower()
+    row = await db.get(AgentSummary, (project_id, agent_lower))
+
+    latest_seq = await _summary_watermark(db, project_id, agent)
+    previous = row if row is not None and row.through_seq and row.detail_summary else None
+    if previous is not None and previous.through_seq >= latest_seq:
+        metrics.incr("summary.cached")
+        return _summary_out(previous, cached=True)
 
-    # History for this agent only
-    history = [m for m in project.messages if m.agent == agent]
+    # History for this agent only — just the turns after the watermark when updating
+    query = _agent_history_query(project_id, agent)
+    if previous is not None:
+        query = query.where(ChatMessage.seq > previous.through_seq)
+    history = (await db.scalars(query)).all()
+    metrics.incr("summary.incremental" if previous is not None else "summary.full")
 
     # Collect all agents' detail summaries for cross-agent context
-    all_detail_summaries: Dict[str, str] = {
-        "strategy": project.strategy_detail_summary or "",
-        "research": project.research_detail_summary or "",
-        "concept": project.concept_detail_summary or "",
-        "present": project.present_detail_summary or "",
-    }
+    all_detail_summaries: Dict[str, str] = collect_detail_summaries(project)
 
-    # Build a single user prompt for summarization
-    user_prompt = build_summary_prompt(
-        agent=agent,
-        project=project,
-        agent_history=history,
-        all_detail_summaries=all_detail_summaries,
-    )
+    data = await _summary_fields(db, client, project, agent, history, previous, all_detail_summaries)
+    row = _store_summary(db, row, project_id, agent_lower, data, latest_seq)
+    await db.commit()
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise HTTPException(
-            status_code=503,
-            detail="OpenAI API key not configured. Add OPENAI_API_KEY to your .env file.",
-        )
+    return _summary_out(row)
 
-    client = AsyncOpenAI(api_key=api_key)
 
+async def _summary_fields(
+    db: AsyncSession,
+    client: AsyncOpenAI,
+    project: Project,
+    agent: str,
+    history: List[ChatMessage],
+    previous: Optional[AgentSummary],
+    all_detail_summaries: Dict[str, str],
+) -> Dict[str, Any]:
+    """
+    The model side of a summary: chunk notes for a long transcript (committed
+    on `db`), then the summary call. Returns the parsed summary JSON.
+    """
     try:
-        response = await client.chat.completions.create(
+        # Transcripts too long for one prompt are condensed part by part first
+        chunk_notes = await summarize_in_chunks(db, client, project.id, agent, history)
+
+        # Build a single user prompt for summarization
+        user_prompt = build_summary_prompt(
+            agent=agent,
+            project=project,
+            agent_history=history,
+            all_detail_summaries=all_detail_summaries,
+            previous=previous,
+            chunk_notes=chunk_notes,
+        )
+
+        messages = [
+            {"role": "system", "content": base_prompt.strip()},
+            {"role": "user", "content": user_prompt},
+        ]
+        response = await scheduler.call(
+            project.id, estimate_tokens(messages, 3000),
+            client.chat.completions.create,
             model="gpt-5.2",
-            messages=[
-                {"role": "system", "content": base_prompt.strip()},
-                {"role": "user", "content": user_prompt},
-            ],
+            messages=messages,
             max_completion_tokens=3000,
             temperature=0.4,
         )
+        record_usage("summary", response.usage)
         raw = response.choices[0].message.content or ""
     except OpenAIError as e:
-        raise HTTPException(status_code=502, detail=str(e))
-
-    import json
+        raise upstream_error(e)
 
     try:
-        data = json.loads(raw)
+        return json.loads(raw)
     except json.JSONDecodeError as e:
         raise HTTPException(status_code=502, detail=f"Failed to parse summary JSON: {e}")
 
-    summary = str(data.get("summary") or "").strip()
-    problem_statment = str(data.get("problem_statment") or "").strip()
-    assumptions = str(data.get("assumptions") or "").strip()
-    detail_summary = str(data.get("detail_summary") or "").strip()
 
-    # Persist onto the project for this agent
-    agent_lower = (agent or "").lower()
-    if agent_lower == "strategy":
-        project.strategy_summary = summary
-        project.strategy_problem_statement = problem_statment
-        project.strategy_assumptions = assumptions
-        project.strategy_detail_summary = detail_summary
-    elif agent_lower == "research":
-        project.research_summary = summary
-        project.research_problem_statement = problem_statment
-        project.research_assumptions = assumptions
-        project.research_detail_summary = detail_summary
-    elif agent_lower == "concept":
-        project.concept_summary = summary
-        project.concept_problem_statement = problem_statment
-        project.concept_assumptions = assumptions
-        project.concept_detail_summary = detail_summary
-    elif agent_lower == "present":
-        project.present_summary = summary
-        project.present_problem_statement = problem_statment
-        project.present_assumptions = assumptions
-        project.present_detail_summary = detail_summary
-
-    db.commit()
-    db.refresh(project)
+def _store_summary(
+    db: AsyncSession,
+    row: Optional[AgentSummary],
+    project_id: str,
+    agent_lower: str,
+    data: Dict[str, Any],
+    through_seq: int,
+) -> AgentSummary:
+    """Write parsed summary JSON onto the agent's summary row (created if missing); not committed."""
+    if row is None:
+        row = AgentSummary(project_id=project_id, agent=agent_lower)
+        db.add(row)
+    row.summary = str(data.get("summary") or "").strip()
+    row.problem_statement = str(data.get("problem_statment") or "").strip()
+    row.assumptions = str(data.get("assumptions") or "").strip()
+    row.detail_summary = str(data.get("detail_summary") or "").strip()
+    row.through_seq = through_seq
+    return row
+
+
+def _summary_lock(project_id: str, agent: str) -> str:
+    return f"summary:{project_id}:{(agent or '').lower()}"
+
+
+async def run_summary_once(client: AsyncOpenAI, project_id: str, agent: str) -> SummaryOut:
+    """
+    run_summary, deduplicated: concurrent calls for the same agent and
+    watermark (double-clicks, several tabs, a queued job) share one run, and
+    runs for the same agent never overlap (see singleflight.py). Uses its own
+    sessions, since the shared run can outlive the caller's request.
+    """
+    async with AsyncSessionLocal() as db:
+        watermark = await _summary_watermark(db, project_id, agent)
 
-    return SummaryOut(
-        summary=summary,
-        problem_statment=problem_statment,
-        assumptions=assumptions,
-        detail_summary=detail_summary,
+    async def run() -> SummaryOut:
+        async with AsyncSessionLocal() as db:
+            return await run_summary(db, client, project_id, agent)
+
+    lock = _summary_lock(project_id, agent)
+    return await flights.do(f"{lock}@{watermark}", run, lock=lock)
+
+
+@router.post("/projects/{project_id}/summary", response_model=SummaryOut)
+async def summarize_agent(
+    project_id: str,
+    body: SummarizeRequest,
+    client: AsyncOpenAI = Depends(get_openai_client),
+):
+    return await run_summary_once(client, project_id, body.agent)
+
+
+class SummarizeAllOut(BaseModel):
+    summaries: Dict[str, SummaryOut]   # agents with a summary; `cached` for the ones skipped
+    timings_ms: Dict[str, int]         # per summarized agent, chunk notes + summary call
+    total_ms: int
+
+
+@router.post("/projects/{project_id}/summary/all", response_model=SummarizeAllOut)
+async def summarize_all_agents(
+    project_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    client: AsyncOpenAI = Depends(get_openai_client),
+):
+    """
+    Refresh every agent's summary at once: the project and all complete turns
+    are loaded in one go, agents with new turns are summarized concurrently,
+    and the new summaries are committed together. Each agent sees the other
+    agents' detail summaries as they were before this call.
+    """
+    started = time.perf_counter()
+    async with AsyncExitStack() as locks:
+        # Same per-agent locks as run_summary_once, always taken in AGENTS order
+        for agent in AGENTS:
+            await locks.enter_async_context(flights.locks.hold(_summary_lock(project_id, agent)))
+
+        project = await db.get(Project, project_id, options=[selectinload(Project.agent_summaries)])
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        rows = {row.agent: row for row in project.agent_summaries}
+        history_by_agent: Dict[str, List[ChatMessage]] = {agent: [] for agent in AGENTS}
+        for msg in await db.scalars(
+            select(ChatMessage)
+            .where(ChatMessage.project_id == project_id, ChatMessage.status == "complete")
+            .order_by(ChatMessage.seq)
+            .options(load_only(ChatMessage.seq, ChatMessage.agent, ChatMessage.role, ChatMessage.content, raiseload=True))
+        ):
+            if msg.agent in history_by_agent:
+                history_by_agent[msg.agent].append(msg)
+
+        all_detail_summaries = collect_detail_summaries(project)
+        pending: Dict[str, tuple[Optional[AgentSummary], List[ChatMessage]]] = {}
+        for agent, history in history_by_agent.items():
+            row = rows.get(agent)
+            previous = row if row is not None and row.through_seq and row.detail_summary else None
+            if previous is not None:
+                history = [m for m in history if m.seq > previous.through_seq]
+            if history:
+                pending[agent] = (previous, history)
+        metrics.incr("summary.cached", len(AGENTS) - len(pending))
+
+        timings_ms: Dict[str, int] = {}
+
+        async def summarize(agent: str) -> Dict[str, Any]:
+            previous, history = pending[agent]
+            metrics.incr("summary.incremental" if previous is not None else "summary.full")
+            agent_started = time.perf_counter()
+            # Chunk notes are committed as they are made, so each agent gets its own session
+            async with AsyncSessionLocal() as chunk_db:
+                data = await _summary_fields(chunk_db, client, project, agent, history, previous, all_detail_summaries)
+            timings_ms[agent] = round((time.perf_counter() - agent_started) * 1000)
+            return data
+
+        results = await asyncio.gather(*(summarize(agent) for agent in pending), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        for agent, data in zip(pending, results):
+            rows[agent] = _store_summary(db, rows.get(agent), project_id, agent, data, pending[agent][1][-1].seq)
+        await db.commit()
+
+    return SummarizeAllOut(
+        summaries={agent: _summary_out(rows[agent], cached=agent not in pending) for agent in AGENTS if agent in rows},
+        timings_ms={agent: timings_ms[agent] for agent in pending},
+        total_ms=round((time.perf_counter() - started) * 1000),
+    )
+
+
+# ── Background jobs (see jobs.py) ─────────────────────────────────────────────
+
+class JobAcceptedOut(BaseModel):
+    """202 body of the /jobs variants; poll GET /jobs/{job_id} for the outcome."""
+
+    job_id: str
+    status: str
+    user_message: Optional[MessageOut] = None  # chat turns: the saved (pending) user message
+
+
+async def _chat_reply_given_up(job: Job, error: str) -> None:
+    """Out of retries: mark the turn's user message failed, as POST /messages would."""
+    async with AsyncSessionLocal() as db:
+        user_msg = await db.get(ChatMessage, job.payload["user_message_id"])
+        if user_msg is not None and user_msg.status == "pending":
+            await _finish_turn(db, user_msg, "", error)
+
+
+@job_handler("chat_reply", on_give_up=_chat_reply_given_up)
+async def _chat_reply_job(client: AsyncOpenAI, job: Job) -> dict:
+    """
+    The model side of a turn queued by POST /messages/jobs; the result is a
+    ChatResponse. The reply's id goes into the job payload in the same
+    commit as the reply, so a retry after a worker died between saving the
+    reply and marking the job succeeded returns that reply instead of failing.
+    """
+    async with AsyncSessionLocal() as db:
+        user_msg = await db.get(ChatMessage, job.payload["user_message_id"])
+        if user_msg is None:
+            raise PermanentJobError("Message not found")
+        reply_id = job.payload.get("assistant_message_id")
+        if user_msg.status == "complete" and reply_id is not None:
+            assistant_msg = await db.get(ChatMessage, reply_id)
+            if assistant_msg is not None:
+                return ChatResponse(
+                    user_message=user_msg,
+                    assistant_message=assistant_msg,
+                    web_search_used=(user_msg.agent or "").lower() == "research",
+                ).model_dump(mode="json")
+        if user_msg.status != "pending":
+            raise PermanentJobError(f"Turn is already {user_msg.status}")
+        project = await db.get(Project, user_msg.project_id, options=[selectinload(Project.agent_summaries)])
+        history = (await db.scalars(
+            _agent_history_query(user_msg.project_id, user_msg.agent).where(ChatMessage.seq < user_msg.seq)
+        )).all()
+        reply_text, citations = await _generate_reply(
+            db, client, project, user_msg.agent, job.payload["content"], user_msg.image_url, history,
+        )
+        if not reply_text:
+            raise RuntimeError("Model returned an empty response.")
+        reply_id = str(uuid.uuid4())
+        await db.execute(
+            update(Job).where(Job.id == job.id).values(payload={**job.payload, "assistant_message_id": reply_id})
+        )
+        assistant_msg = await _finish_turn(db, user_msg, reply_text, reply_id=reply_id)
+        return ChatResponse(
+            user_message=user_msg,
+            assistant_message=assistant_msg,
+            citations=citations,
+            web_search_used=(user_msg.agent or "").lower() == "research",
+        ).model_dump(mode="json")
+
+
+@job_handler("summary")
+async def _summary_job(client: AsyncOpenAI, job: Job) -> dict:
+    summary = await run_summary_once(client, job.project_id, job.payload["agent"])
+    return summary.model_dump(mode="json")
+
+
+@router.post("/projects/{project_id}/messages/jobs", response_model=JobAcceptedOut, status_code=202)
+async def send_message_job(
+    project_id: str,
+    body: SendMessageRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Queue a turn instead of waiting for it: the user message is saved as
+    pending and a worker produces the reply. Poll GET /jobs/{job_id} (its
+    result is a ChatResponse) or watch the project's /events stream.
+    """
+    if await db.get(Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    user_msg = await _save_user_message(db, project_id, body)
+    job = await enqueue(
+        db, "chat_reply", {"user_message_id": user_msg.id, "content": body.content}, project_id=project_id,
     )
+    await db.commit()
+    wake_workers()
+    return JobAcceptedOut(job_id=job.id, status=job.status, user_message=user_msg)
+
+
+@router.post("/projects/{project_id}/summary/jobs", response_model=JobAcceptedOut, status_code=202)
+async def summarize_agent_job(
+    project_id: str,
+    body: SummarizeRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Queue POST /summary; the job's result is a SummaryOut."""
+    if await db.get(Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    job = await enqueue(db, "summary", {"agent": body.agent}, project_id=project_id)
+    await db.commit()
+    wake_workers()
+    return JobAcceptedOut(job_id=job.id, status=job.status)
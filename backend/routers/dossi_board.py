@@ -3,23 +3,35 @@ import os
 import shutil
 import httpx
 from pathlib import Path
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, Response, UploadFile
 from pydantic import BaseModel
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 from datetime import datetime
 
-from database import get_db
+from conditional import not_modified
+from database import get_db, get_async_db
 from models import DossiBoardItem, Project
 
 router = APIRouter()
 
 VALID_FOLDERS = {"images", "typefaces", "websites"}
 
+MAX_MEMBERSHIP_KEYS = 100
+
 # Files are stored under backend/uploads/dossi_board/<project_id>/<folder>/
 UPLOAD_ROOT = Path(__file__).parent.parent / "uploads" / "dossi_board"
 
 
+def _save_upload(src, dest_path: Path) -> None:
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    with dest_path.open("wb") as f:
+        shutil.copyfileobj(src, f)
+
+
 # ── Pydantic schemas ──────────────────────────────────────────────────────────
 
 class DossiBoardItemOut(BaseModel):
@@ -35,22 +47,65 @@ class DossiBoardItemOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class BoardMembershipOut(BaseModel):
+    # stored file_path (e.g. "asset:/assets/x.png") / source_url -> ids of projects whose board holds it
+    file_path: dict[str, List[str]]
+    source_url: dict[str, List[str]]
+
+
 # ── Routes ────────────────────────────────────────────────────────────────────
 
+@router.get("/dossi-board/membership", response_model=BoardMembershipOut)
+def get_board_membership(
+    file_path: List[str] = Query([], description="Stored file paths, e.g. asset:/assets/x.png"),
+    source_url: List[str] = Query([], description="Website source URLs"),
+    db: Session = Depends(get_db),
+):
+    """Which projects already have these assets / URLs on their dossi board — one indexed query."""
+    if not file_path and not source_url:
+        raise HTTPException(status_code=400, detail="Pass at least one file_path or source_url")
+    if len(file_path) + len(source_url) > MAX_MEMBERSHIP_KEYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_MEMBERSHIP_KEYS} keys per request")
+
+    conditions = []
+    if file_path:
+        conditions.append(DossiBoardItem.file_path.in_(file_path))
+    if source_url:
+        conditions.append(DossiBoardItem.source_url.in_(source_url))
+    rows = db.execute(
+        select(DossiBoardItem.project_id, DossiBoardItem.file_path, DossiBoardItem.source_url)
+        .where(or_(*conditions))
+        .distinct()
+    ).all()
+
+    out = BoardMembershipOut(
+        file_path={path: [] for path in file_path},
+        source_url={url: [] for url in source_url},
+    )
+    for project_id, item_path, item_url in rows:
+        if item_path in out.file_path and project_id not in out.file_path[item_path]:
+            out.file_path[item_path].append(project_id)
+        if item_url in out.source_url and project_id not in out.source_url[item_url]:
+            out.source_url[item_url].append(project_id)
+    return out
+
+
 @router.get("/projects/{project_id}/dossi-board", response_model=list[DossiBoardItemOut])
 def list_items(
     project_id: str,
+    response: Response,
     folder: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
 ):
-    project = db.get(Project, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    if folder and folder not in VALID_FOLDERS:
+        raise HTTPException(status_code=400, detail=f"Invalid folder. Must be one of: {', '.join(VALID_FOLDERS)}")
+    cached = not_modified(db, project_id, if_none_match, response)
+    if cached:
+        return cached
 
     query = db.query(DossiBoardItem).filter(DossiBoardItem.project_id == project_id)
     if folder:
-        if folder not in VALID_FOLDERS:
-            raise HTTPException(status_code=400, detail=f"Invalid folder. Must be one of: {', '.join(VALID_FOLDERS)}")
         query = query.filter(DossiBoardItem.folder == folder)
 
     return query.order_by(DossiBoardItem.created_at).all()
@@ -62,9 +117,9 @@ async def upload_item(
     folder: str = Form(...),
     label: Optional[str] = Form(None),
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    project = db.get(Project, project_id)
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
@@ -72,14 +127,11 @@ async def upload_item(
         raise HTTPException(status_code=400, detail=f"Invalid folder. Must be one of: {', '.join(VALID_FOLDERS)}")
 
     # Build storage path: uploads/dossi_board/<project_id>/<folder>/<uuid>_<filename>
-    dest_dir = UPLOAD_ROOT / project_id / folder
-    dest_dir.mkdir(parents=True, exist_ok=True)
-
     safe_filename = f"{uuid.uuid4().hex}_{file.filename}"
-    dest_path = dest_dir / safe_filename
+    dest_path = UPLOAD_ROOT / project_id / folder / safe_filename
 
-    with dest_path.open("wb") as f:
-        shutil.copyfileobj(file.file, f)
+    # Disk I/O off the event loop: a large upload must not stall every other request
+    await run_in_threadpool(_save_upload, file.file, dest_path)
 
     # Store a relative path from the uploads root so it's portable
     relative_path = f"{project_id}/{folder}/{safe_filename}"
@@ -92,8 +144,8 @@ async def upload_item(
         label=label,
     )
     db.add(item)
-    db.commit()
-    db.refresh(item)
+    await db.commit()
+    await db.refresh(item)
     return item
 
 
@@ -165,10 +217,10 @@ class AddWebsiteRequest(BaseModel):
 async def add_item_from_url(
     project_id: str,
     body: AddWebsiteRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Save a website URL reference to the websites folder, with a thumbnail fetched via microlink."""
-    project = db.get(Project, project_id)
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
@@ -199,8 +251,8 @@ async def add_item_from_url(
         source_url=body.url,
     )
     db.add(item)
-    db.commit()
-    db.refresh(item)
+    await db.commit()
+    await db.refresh(item)
     return item
 
 
@@ -0,0 +1,53 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db
+from models import Job
+
+router = APIRouter()
+
+
+class JobOut(BaseModel):
+    id: str
+    kind: str
+    project_id: Optional[str] = None
+    status: str                       # queued | running | succeeded | failed
+    attempts: int
+    max_attempts: int
+    run_after: datetime               # next attempt no earlier than this (retry backoff)
+    error: Optional[str] = None       # last failure, also while a retry is queued
+    result: Optional[Any] = None
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+@router.get("/jobs/{job_id}", response_model=JobOut)
+async def get_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """
+    The finished job's result (ChatResponse for chat turns, SummaryOut for
+    summaries). 202 with the JobOut while it is queued or running; 502 with
+    the error once it has failed for good.
+    """
+    job = await db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == "failed":
+        raise HTTPException(status_code=502, detail=job.error or "Job failed")
+    if job.status != "succeeded":
+        response.status_code = 202
+        return JobOut.model_validate(job)
+    return job.result
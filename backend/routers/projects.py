@@ -1,20 +1,45 @@
+import base64
 import random
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from typing import Optional
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, model_validator
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session, load_only, selectinload
+from typing import Any, Optional
 from datetime import datetime
+from starlette.concurrency import run_in_threadpool
 
-from database import get_db
-from models import Project
+from broker import broker
+from conditional import not_modified
+from database import SessionLocal, get_db
+from models import AgentSummary, ChatMessage, DossiBoardItem, Project, ProjectChange
+from sse import SSE_HEADERS, sse_event
+from prompt import AGENTS
+from routers.chat import MessageOut
+from routers.dossi_board import DossiBoardItemOut
 
 router = APIRouter()
 
 THUMBNAIL_COUNT = 4
 
+SSE_HEARTBEAT_SECONDS = 15
+SSE_RETRY_MS = 3000  # browser reconnect delay after a dropped stream
+
+SUMMARY_FIELDS = ("summary", "problem_statement", "assumptions", "detail_summary")
+
 
 # ── Pydantic schemas ──────────────────────────────────────────────────────────
 
+class AgentSummaryOut(BaseModel):
+    summary: Optional[str] = None
+    problem_statement: Optional[str] = None
+    assumptions: Optional[str] = None
+    detail_summary: Optional[str] = None
+
+    model_config = {"from_attributes": True}
+
+
 class ProjectOut(BaseModel):
     id: str
     title: str
@@ -23,25 +48,88 @@ class ProjectOut(BaseModel):
     thumbnail_index: int
     created_at: datetime
     updated_at: datetime
-    strategy_summary: Optional[str]
-    strategy_problem_statement: Optional[str]
-    strategy_assumptions: Optional[str]
-    strategy_detail_summary: Optional[str]
-    research_summary: Optional[str]
-    research_problem_statement: Optional[str]
-    research_assumptions: Optional[str]
-    research_detail_summary: Optional[str]
-    concept_summary: Optional[str]
-    concept_problem_statement: Optional[str]
-    concept_assumptions: Optional[str]
-    concept_detail_summary: Optional[str]
-    present_summary: Optional[str]
-    present_problem_statement: Optional[str]
-    present_assumptions: Optional[str]
-    present_detail_summary: Optional[str]
+    agent_summaries: dict[str, AgentSummaryOut] = {}
+    # Flat per-agent fields, read from agent_summaries (kept for existing clients)
+    strategy_summary: Optional[str] = None
+    strategy_problem_statement: Optional[str] = None
+    strategy_assumptions: Optional[str] = None
+    strategy_detail_summary: Optional[str] = None
+    research_summary: Optional[str] = None
+    research_problem_statement: Optional[str] = None
+    research_assumptions: Optional[str] = None
+    research_detail_summary: Optional[str] = None
+    concept_summary: Optional[str] = None
+    concept_problem_statement: Optional[str] = None
+    concept_assumptions: Optional[str] = None
+    concept_detail_summary: Optional[str] = None
+    present_summary: Optional[str] = None
+    present_problem_statement: Optional[str] = None
+    present_assumptions: Optional[str] = None
+    present_detail_summary: Optional[str] = None
 
     model_config = {"from_attributes": True}
 
+    @model_validator(mode="before")
+    @classmethod
+    def _from_project(cls, data: Any) -> Any:
+        if not isinstance(data, Project):
+            return data
+        out: dict[str, Any] = {
+            "id": data.id,
+            "title": data.title,
+            "description": data.description,
+            "archived": data.archived,
+            "thumbnail_index": data.thumbnail_index,
+            "created_at": data.created_at,
+            "updated_at": data.updated_at,
+            "agent_summaries": {row.agent: row for row in data.agent_summaries},
+        }
+        for row in data.agent_summaries:
+            if row.agent in AGENTS:
+                for field in SUMMARY_FIELDS:
+                    out[f"{row.agent}_{field}"] = getattr(row, field)
+        return out
+
+
+class ProjectListItemOut(BaseModel):
+    """Compact row for the home page / project pickers — no summary columns."""
+
+    id: str
+    title: str
+    archived: bool
+    thumbnail_index: int
+    created_at: datetime
+    updated_at: datetime
+    element_count: Optional[int] = None  # dossi board items; only with ?with_counts=true
+
+    model_config = {"from_attributes": True}
+
+
+class ProjectBootstrapOut(BaseModel):
+    """Everything ProjectPage needs on open, in one response."""
+
+    project: ProjectOut
+    messages: dict[str, list[MessageOut]]       # newest page per agent, oldest first
+    has_more_messages: dict[str, bool]          # older history exists — page back with `before`
+    websites: list[DossiBoardItemOut]
+
+
+class DeletedEntityOut(BaseModel):
+    type: str   # "message" | "board_item" | "summary"
+    id: str     # the agent name for "summary"
+
+
+class ProjectChangesOut(BaseModel):
+    """Everything that changed after `since`; apply in order and keep `version` for the next poll."""
+
+    version: int
+    reset: bool = False                         # log can't cover `since` — refetch /bootstrap instead
+    project: Optional[ProjectOut] = None        # set when the project row itself changed
+    messages: dict[str, list[MessageOut]] = {}  # new / edited messages per agent, oldest first
+    board_items: list[DossiBoardItemOut] = []
+    agent_summaries: dict[str, AgentSummaryOut] = {}
+    deleted: list[DeletedEntityOut] = []
+
 
 class CreateProjectRequest(BaseModel):
     title: str
@@ -60,21 +148,303 @@ class UpdateAgentSummaryRequest(BaseModel):
     assumptions: Optional[str] = None
 
 
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def _encode_cursor(project: Project) -> str:
+    raw = f"{project.updated_at.isoformat()}|{project.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        updated_at, project_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(updated_at), project_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 # ── Routes ────────────────────────────────────────────────────────────────────
 
-@router.get("/projects", response_model=list[ProjectOut])
-def list_projects(archived: bool = False, db: Session = Depends(get_db)):
-    return db.query(Project).filter(Project.archived == archived).all()
+@router.get("/projects", response_model=list[ProjectListItemOut])
+def list_projects(
+    response: Response,
+    archived: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    with_counts: bool = Query(False, description="Include each project's dossi board element_count"),
+    db: Session = Depends(get_db),
+):
+    """
+    Projects ordered by most recently updated.
+
+    With `limit`, at most that many are returned and, if more remain, the
+    `X-Next-Cursor` response header carries the cursor for the next page.
+    """
+    query = (
+        select(Project)
+        .where(Project.archived == archived)
+        .order_by(Project.updated_at.desc(), Project.id.desc())
+        .options(load_only(
+            Project.title, Project.archived, Project.thumbnail_index, Project.created_at, Project.updated_at,
+        ))
+    )
+    if cursor is not None:
+        updated_at, project_id = _decode_cursor(cursor)
+        query = query.where(or_(
+            Project.updated_at < updated_at,
+            and_(Project.updated_at == updated_at, Project.id < project_id),
+        ))
+    if limit is None:
+        rows = db.scalars(query).all()
+    else:
+        rows = db.scalars(query.limit(limit + 1)).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+
+    if not with_counts:
+        return rows
+    counts = dict(db.execute(
+        select(DossiBoardItem.project_id, func.count())
+        .where(DossiBoardItem.project_id.in_([p.id for p in rows]))
+        .group_by(DossiBoardItem.project_id)
+    ).all())
+    return [
+        ProjectListItemOut.model_validate(p).model_copy(update={"element_count": counts.get(p.id, 0)})
+        for p in rows
+    ]
 
 
 @router.get("/projects/{project_id}", response_model=ProjectOut)
-def get_project(project_id: str, db: Session = Depends(get_db)):
-    project = db.get(Project, project_id)
+def get_project(
+    project_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    cached = not_modified(db, project_id, if_none_match, response)
+    if cached:
+        return cached
+    project = db.get(Project, project_id, options=[selectinload(Project.agent_summaries)])
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     return project
 
 
+@router.get("/projects/{project_id}/bootstrap", response_model=ProjectBootstrapOut)
+def get_project_bootstrap(
+    project_id: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500, description="Messages per agent"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Project, the newest `limit` messages of each agent and the saved websites,
+    in a fixed handful of queries regardless of history size. Answers a
+    current If-None-Match with 304 after reading only the project version.
+    """
+    cached = not_modified(db, project_id, if_none_match, response)
+    if cached:
+        return cached
+
+    project = db.get(Project, project_id, options=[selectinload(Project.agent_summaries)])
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # Newest limit+1 rows per agent in one pass; the extra row only signals has_more
+    ranked = (
+        select(
+            ChatMessage.id,
+            func.row_number().over(partition_by=ChatMessage.agent, order_by=ChatMessage.seq.desc()).label("rn"),
+        )
+        .where(ChatMessage.project_id == project_id)
+        .subquery()
+    )
+    rows = db.scalars(
+        select(ChatMessage)
+        .join(ranked, ranked.c.id == ChatMessage.id)
+        .where(ranked.c.rn <= limit + 1)
+        .order_by(ChatMessage.seq)
+        .options(load_only(
+            ChatMessage.seq, ChatMessage.agent, ChatMessage.role, ChatMessage.content, ChatMessage.image_url,
+            ChatMessage.status, ChatMessage.error, ChatMessage.created_at, raiseload=True,
+        ))
+    ).all()
+
+    by_agent: dict[str, list[ChatMessage]] = {agent: [] for agent in AGENTS}
+    for msg in rows:
+        if msg.agent:
+            by_agent.setdefault(msg.agent, []).append(msg)
+    has_more = {agent: len(msgs) > limit for agent, msgs in by_agent.items()}
+    messages = {agent: msgs[-limit:] for agent, msgs in by_agent.items()}
+
+    websites = db.scalars(
+        select(DossiBoardItem)
+        .where(DossiBoardItem.project_id == project_id, DossiBoardItem.folder == "websites")
+        .order_by(DossiBoardItem.created_at)
+    ).all()
+
+    return ProjectBootstrapOut(
+        project=ProjectOut.model_validate(project),
+        messages={agent: [MessageOut.model_validate(m) for m in msgs] for agent, msgs in messages.items()},
+        has_more_messages=has_more,
+        websites=[DossiBoardItemOut.model_validate(item) for item in websites],
+    )
+
+
+def _collect_changes(db: Session, project_id: str, since: int) -> Optional[ProjectChangesOut]:
+    """
+    Delta since a known project version, read from the project_changes log:
+    current rows for everything upserted, tombstones for everything deleted.
+    None if the project doesn't exist.
+    """
+    version = db.scalar(select(Project.version).where(Project.id == project_id))
+    if version is None:
+        return None
+    if since >= version:
+        return ProjectChangesOut(version=version)
+
+    log = db.execute(
+        select(ProjectChange.version, ProjectChange.entity, ProjectChange.entity_id, ProjectChange.op)
+        .where(ProjectChange.project_id == project_id, ProjectChange.version > since)
+        .order_by(ProjectChange.version, ProjectChange.id)
+    ).all()
+    # Versions are contiguous, so a gap right after `since` means the log was pruned (or predates it)
+    if not log or log[0].version != since + 1:
+        return ProjectChangesOut(version=version, reset=True)
+
+    # Latest op per entity wins
+    latest: dict[tuple[str, str], str] = {}
+    for row in log:
+        latest[(row.entity, row.entity_id)] = row.op
+    upserted: dict[str, list[str]] = {"project": [], "message": [], "board_item": [], "summary": []}
+    deleted: list[DeletedEntityOut] = []
+    for (entity, entity_id), op in latest.items():
+        if op == "delete":
+            deleted.append(DeletedEntityOut(type=entity, id=entity_id))
+        else:
+            upserted[entity].append(entity_id)
+
+    out = ProjectChangesOut(version=version, deleted=deleted)
+    if upserted["project"]:
+        project = db.get(Project, project_id, options=[selectinload(Project.agent_summaries)])
+        out.project = ProjectOut.model_validate(project)
+    if upserted["message"]:
+        rows = db.scalars(
+            select(ChatMessage)
+            .where(ChatMessage.project_id == project_id, ChatMessage.id.in_(upserted["message"]))
+            .order_by(ChatMessage.seq)
+            .options(load_only(
+                ChatMessage.seq, ChatMessage.agent, ChatMessage.role, ChatMessage.content, ChatMessage.image_url,
+                ChatMessage.status, ChatMessage.error, ChatMessage.created_at, raiseload=True,
+            ))
+        ).all()
+        for msg in rows:
+            out.messages.setdefault(msg.agent or "", []).append(MessageOut.model_validate(msg))
+    if upserted["board_item"]:
+        items = db.scalars(
+            select(DossiBoardItem)
+            .where(DossiBoardItem.project_id == project_id, DossiBoardItem.id.in_(upserted["board_item"]))
+            .order_by(DossiBoardItem.created_at)
+        ).all()
+        out.board_items = [DossiBoardItemOut.model_validate(item) for item in items]
+    if upserted["summary"]:
+        summaries = db.scalars(
+            select(AgentSummary)
+            .where(AgentSummary.project_id == project_id, AgentSummary.agent.in_(upserted["summary"]))
+        ).all()
+        out.agent_summaries = {row.agent: AgentSummaryOut.model_validate(row) for row in summaries}
+    return out
+
+
+def _project_version(project_id: str) -> Optional[int]:
+    with SessionLocal() as db:
+        return db.scalar(select(Project.version).where(Project.id == project_id))
+
+
+def _changes_since(project_id: str, since: int) -> Optional[ProjectChangesOut]:
+    """`_collect_changes` on a short-lived session — SSE streams don't hold a connection while idle."""
+    with SessionLocal() as db:
+        return _collect_changes(db, project_id, since)
+
+
+def _sse_frames(changes: ProjectChangesOut) -> list[str]:
+    """One typed event per changed entity, then a `version` event carrying the resume id."""
+    if changes.reset:
+        return [sse_event("reset", {"version": changes.version}, changes.version)]
+    frames = []
+    if changes.project is not None:
+        frames.append(sse_event("project", changes.project))
+    for agent, msgs in changes.messages.items():
+        frames.extend(sse_event("message", {"agent": agent, "message": msg}) for msg in msgs)
+    frames.extend(sse_event("board_item", item) for item in changes.board_items)
+    frames.extend(sse_event("summary", {"agent": agent, "summary": row}) for agent, row in changes.agent_summaries.items())
+    frames.extend(sse_event("deleted", tombstone) for tombstone in changes.deleted)
+    # Only the last frame of a batch carries an id, so a reconnect never resumes half-way through one
+    frames.append(sse_event("version", {"version": changes.version}, changes.version))
+    return frames
+
+
+@router.get("/projects/{project_id}/changes", response_model=ProjectChangesOut)
+def get_project_changes(
+    project_id: str,
+    since: int = Query(..., ge=0, description="Project version the client already has"),
+    db: Session = Depends(get_db),
+):
+    """Everything that changed after version `since`; `reset` when the log can't say."""
+    changes = _collect_changes(db, project_id, since)
+    if changes is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return changes
+
+
+@router.get("/projects/{project_id}/events")
+async def project_events(
+    project_id: str,
+    request: Request,
+    since: Optional[int] = Query(None, ge=0, description="Replay changes after this version"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-Sent Events for one project: `project`, `message`, `board_item`,
+    `summary` and `deleted` events as writers commit, each batch closed by a
+    `version` event whose id is the project version. Browsers resume from
+    Last-Event-ID on reconnect; a fresh connection can pass `since` instead.
+    """
+    resume = int(last_event_id) if last_event_id and last_event_id.isdigit() else since
+    version = await run_in_threadpool(_project_version, project_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    async def stream():
+        cursor = resume if resume is not None else version
+        async with broker.subscribe(project_id) as sub:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            idle = 0.0
+            while not await request.is_disconnected():
+                changes = await run_in_threadpool(_changes_since, project_id, cursor)
+                if changes is None:
+                    yield sse_event("project_deleted", {"id": project_id})
+                    return
+                if changes.version > cursor:
+                    for frame in _sse_frames(changes):
+                        yield frame
+                    cursor, idle = changes.version, 0.0
+                elif idle >= SSE_HEARTBEAT_SECONDS:
+                    yield ": keep-alive\n\n"  # keeps proxies from closing an idle stream
+                    idle = 0.0
+                started = time.monotonic()
+                await sub.wait(SSE_HEARTBEAT_SECONDS)
+                idle += time.monotonic() - started
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 @router.post("/projects", response_model=ProjectOut, status_code=201)
 def create_project(body: CreateProjectRequest, db: Session = Depends(get_db)):
     project = Project(
@@ -110,34 +480,19 @@ def update_agent_summary(project_id: str, body: UpdateAgentSummaryRequest, db: S
         raise HTTPException(status_code=404, detail="Project not found")
 
     agent = body.agent.lower()
-    if agent == "strategy":
-        if body.summary is not None:
-            project.strategy_summary = body.summary
-        if body.problem_statement is not None:
-            project.strategy_problem_statement = body.problem_statement
-        if body.assumptions is not None:
-            project.strategy_assumptions = body.assumptions
-    elif agent == "research":
-        if body.summary is not None:
-            project.research_summary = body.summary
-        if body.problem_statement is not None:
-            project.research_problem_statement = body.problem_statement
-        if body.assumptions is not None:
-            project.research_assumptions = body.assumptions
-    elif agent == "concept":
-        if body.summary is not None:
-            project.concept_summary = body.summary
-        if body.problem_statement is not None:
-            project.concept_problem_statement = body.problem_statement
-        if body.assumptions is not None:
-            project.concept_assumptions = body.assumptions
-    elif agent == "present":
-        if body.summary is not None:
-            project.present_summary = body.summary
-        if body.problem_statement is not None:
-            project.present_problem_statement = body.problem_statement
-        if body.assumptions is not None:
-            project.present_assumptions = body.assumptions
+    if not agent:
+        raise HTTPException(status_code=400, detail="agent is required")
+
+    row = db.get(AgentSummary, (project_id, agent))
+    if row is None:
+        row = AgentSummary(project_id=project_id, agent=agent)
+        db.add(row)
+    if body.summary is not None:
+        row.summary = body.summary
+    if body.problem_statement is not None:
+        row.problem_statement = body.problem_statement
+    if body.assumptions is not None:
+        row.assumptions = body.assumptions
 
     db.commit()
     db.refresh(project)
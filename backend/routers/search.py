@@ -0,0 +1,163 @@
+import html
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+
+from database import get_db
+
+router = APIRouter()
+
+ResultType = Literal["project", "summary", "message", "board_item"]
+
+SNIPPET_OPEN, SNIPPET_CLOSE = "<mark>", "</mark>"
+# What snippet() wraps hits in: control characters that don't occur in typed
+# text, swapped for <mark> only after the snippet has been HTML-escaped
+_HIT_OPEN, _HIT_CLOSE = "\x02", "\x03"
+
+
+# ── Pydantic schemas ──────────────────────────────────────────────────────────
+
+class SearchResultOut(BaseModel):
+    type: ResultType
+    id: str               # message / board item id; project id for "project" and "summary"
+    project_id: str
+    project_title: str
+    agent: Optional[str] = None
+    snippet: str          # HTML-escaped matched text with hits wrapped in <mark>…</mark>; safe to render as HTML
+    rank: float           # raw bm25 — lower is a better match, comparable only within one type
+    score: float          # rank relative to the best match of the same type: 1.0 = best, near 0 = weakest
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchResultOut]
+    next_offset: Optional[int] = None
+
+
+# ── Query building ────────────────────────────────────────────────────────────
+
+# type -> SELECT over one FTS index, joined back to its source row (and project title).
+#
+# bm25() depends on each index's own document count and lengths, so raw
+# ranks from different indexes aren't comparable: a short project title and
+# a long chat message matching equally well score very differently. So each
+# source is wrapped in _NORMALISED, giving every row a `score`: its bm25
+# divided by the best bm25 among that source's matches (bm25 is negative,
+# so this lands in (0, 1]), and the merged list is ordered by score. The best hit of every type
+# scores 1.0 and they interleave at the top; below that, results sort by
+# how close they come to their own type's best match.
+_SOURCES: dict[str, str] = {
+    "project": """
+        SELECT 'project' AS type, p.id AS id, p.id AS project_id, p.title AS project_title, NULL AS agent,
+               snippet(projects_fts, -1, :open, :close, '…', 16) AS snippet, bm25(projects_fts) AS rank
+        FROM projects_fts JOIN projects p ON p.rowid = projects_fts.rowid
+        WHERE projects_fts MATCH :q {project_filter}
+    """,
+    "summary": """
+        SELECT 'summary' AS type, s.project_id AS id, s.project_id AS project_id, p.title AS project_title,
+               s.agent AS agent,
+               snippet(agent_summaries_fts, -1, :open, :close, '…', 16) AS snippet, bm25(agent_summaries_fts) AS rank
+        FROM agent_summaries_fts
+        JOIN agent_summaries s ON s.rowid = agent_summaries_fts.rowid
+        JOIN projects p ON p.id = s.project_id
+        WHERE agent_summaries_fts MATCH :q {project_filter} {agent_filter}
+    """,
+    "message": """
+        SELECT 'message' AS type, m.id AS id, m.project_id AS project_id, p.title AS project_title,
+               m.agent AS agent,
+               snippet(chat_messages_fts, 0, :open, :close, '…', 16) AS snippet, bm25(chat_messages_fts) AS rank
+        FROM chat_messages_fts
+        JOIN chat_messages m ON m.rowid = chat_messages_fts.rowid
+        JOIN projects p ON p.id = m.project_id
+        WHERE chat_messages_fts MATCH :q {project_filter} {agent_filter}
+    """,
+    "board_item": """
+        SELECT 'board_item' AS type, d.id AS id, d.project_id AS project_id, p.title AS project_title, NULL AS agent,
+               snippet(dossi_board_fts, -1, :open, :close, '…', 16) AS snippet, bm25(dossi_board_fts) AS rank
+        FROM dossi_board_fts
+        JOIN dossi_board_items d ON d.rowid = dossi_board_fts.rowid
+        JOIN projects p ON p.id = d.project_id
+        WHERE dossi_board_fts MATCH :q {project_filter}
+    """,
+}
+
+# bm25() can't be used inside a window function, hence the subquery
+_NORMALISED = "SELECT *, rank / MIN(rank) OVER () AS score FROM ({source})"
+
+# Column holding the project id in each source, for the project_id filter
+_PROJECT_COLUMN = {"project": "p.id", "summary": "s.project_id", "message": "m.project_id", "board_item": "d.project_id"}
+_AGENT_COLUMN = {"summary": "s.agent", "message": "m.agent"}
+
+
+def _highlight(snippet: str) -> str:
+    """Escape user content in a snippet, then turn the hit markers into <mark> tags."""
+    return html.escape(snippet or "").replace(_HIT_OPEN, SNIPPET_OPEN).replace(_HIT_CLOSE, SNIPPET_CLOSE)
+
+
+def _fts_query(q: str) -> str:
+    """
+    Turn free text into a safe FTS5 query: every word is quoted (so user input
+    can't inject FTS syntax) and the last word is prefix-matched for search-as-you-type.
+    """
+    terms = ['"' + word.replace('"', '""') + '"' for word in q.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+# ── Routes ────────────────────────────────────────────────────────────────────
+
+@router.get("/search", response_model=SearchResponse)
+def search(
+    q: str = Query(..., min_length=1),
+    project_id: Optional[str] = None,
+    agent: Optional[str] = None,
+    types: Optional[List[ResultType]] = Query(None, description="Restrict to these result types"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Ranked full-text search across projects, agent summaries, chat messages
+    and dossi board items, merged by per-type normalised score (see _SOURCES).
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        raise HTTPException(status_code=501, detail="Full-text search is only available on SQLite")
+
+    fts_q = _fts_query(q)
+    if not fts_q:
+        return SearchResponse(results=[])
+
+    selected = types or list(_SOURCES)
+    if agent is not None:
+        # Projects and board items have no agent
+        selected = [t for t in selected if t in _AGENT_COLUMN]
+    if not selected:
+        return SearchResponse(results=[])
+
+    parts = [
+        _NORMALISED.format(source=_SOURCES[t].format(
+            project_filter=f"AND {_PROJECT_COLUMN[t]} = :project_id" if project_id is not None else "",
+            agent_filter=f"AND {_AGENT_COLUMN[t]} = :agent" if agent is not None else "",
+        ))
+        for t in selected
+    ]
+    sql = " UNION ALL ".join(parts) + " ORDER BY score DESC, rank, id LIMIT :limit OFFSET :offset"
+
+    rows = db.execute(text(sql), {
+        "q": fts_q,
+        "open": _HIT_OPEN,
+        "close": _HIT_CLOSE,
+        "project_id": project_id,
+        "agent": agent,
+        "limit": limit + 1,
+        "offset": offset,
+    }).mappings().all()
+
+    next_offset = offset + limit if len(rows) > limit else None
+    return SearchResponse(
+        results=[SearchResultOut(**{**row, "snippet": _highlight(row["snippet"])}) for row in rows[:limit]],
+        next_offset=next_offset,
+    )
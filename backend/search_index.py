@@ -0,0 +1,82 @@
+"""
+SQLite FTS5 indexes behind /api/search.
+
+Each index is an external-content FTS5 table over its source table, kept
+current by AFTER INSERT/UPDATE/DELETE triggers:
+
+    chat_messages_fts     chat_messages.content
+    projects_fts          projects.title, projects.description
+    agent_summaries_fts   agent_summaries.summary / problem_statement / assumptions / detail_summary
+    dossi_board_fts       dossi_board_items.label, filename, source_url
+
+Rows are matched on the source table's implicit rowid, which VACUUM may
+renumber — run a rebuild afterwards:
+
+    python -m search_index rebuild
+"""
+import argparse
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# index name -> (source table, indexed columns)
+FTS_INDEXES: dict[str, tuple[str, tuple[str, ...]]] = {
+    "chat_messages_fts": ("chat_messages", ("content",)),
+    "projects_fts": ("projects", ("title", "description")),
+    "agent_summaries_fts": ("agent_summaries", ("summary", "problem_statement", "assumptions", "detail_summary")),
+    "dossi_board_fts": ("dossi_board_items", ("label", "filename", "source_url")),
+}
+
+
+def _ddl(index: str, table: str, columns: tuple[str, ...]) -> list[str]:
+    cols = ", ".join(columns)
+    new_vals = ", ".join(f"new.{c}" for c in columns)
+    old_vals = ", ".join(f"old.{c}" for c in columns)
+    insert_new = f"INSERT INTO {index}(rowid, {cols}) VALUES (new.rowid, {new_vals});"
+    delete_old = f"INSERT INTO {index}({index}, rowid, {cols}) VALUES ('delete', old.rowid, {old_vals});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+        f"{cols}, content='{table}', content_rowid='rowid', tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+        # Only re-index when an indexed column changes (projects are updated on every message)
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE OF {cols} ON {table} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def ensure_search_index(conn: Connection) -> bool:
+    """Create any missing FTS tables and triggers. Returns False on non-SQLite databases."""
+    if conn.dialect.name != "sqlite":
+        return False
+    for index, (table, columns) in FTS_INDEXES.items():
+        for stmt in _ddl(index, table, columns):
+            conn.execute(text(stmt))
+    return True
+
+
+def rebuild_search_index(conn: Connection) -> None:
+    """Re-index every row of every source table from scratch."""
+    ensure_search_index(conn)
+    for index in FTS_INDEXES:
+        conn.execute(text(f"INSERT INTO {index}({index}) VALUES ('rebuild')"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the SQLite full-text search index.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    from database import engine
+
+    if engine.dialect.name != "sqlite":
+        raise SystemExit("Full-text search is only available on SQLite.")
+    with engine.begin() as conn:
+        rebuild_search_index(conn)
+    print(f"Rebuilt {', '.join(FTS_INDEXES)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Single-flight for expensive, idempotent work (agent summaries).
+
+    summary = await flights.do(f"{lock}@{watermark}", run, lock=lock)
+
+Concurrent do() calls with the same key share one run of `fn` and all get
+its result (or its exception). The run is a task of its own, so it finishes
+— and commits — even if the caller that started it disconnects.
+
+Runs also hold the named `lock` (default: the key) from the lock backend,
+chosen with LOCKS_BACKEND:
+
+    memory    — an asyncio.Lock per name; serializes runs within this
+                worker only (the default)
+    database  — additionally takes a row in the `locks` table, renewed
+                while the run lasts, so runs in other workers wait too
+
+A caller that waited for another worker's lock re-runs `fn`, which is
+expected to find the other run's stored result (run_summary returns the
+summary as cached when no turns arrived since).
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+import anyio
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from database import AsyncSessionLocal
+from metrics import metrics
+from models import Lock
+
+logger = logging.getLogger("dossier.singleflight")
+
+LOCKS_BACKEND = os.getenv("LOCKS_BACKEND", "memory")
+LOCK_LEASE_SECONDS = float(os.getenv("LOCK_LEASE_SECONDS", "60"))
+LOCK_POLL_INTERVAL = float(os.getenv("LOCK_POLL_INTERVAL", "0.5"))
+
+T = TypeVar("T")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class MemoryLocks:
+    """Named asyncio locks, dropped once nobody holds or waits for them."""
+
+    def __init__(self):
+        self._locks: dict[str, tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def hold(self, name: str) -> AsyncIterator[None]:
+        lock, users = self._locks.get(name, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._locks[name] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[name]
+            if users == 1:
+                del self._locks[name]
+            else:
+                self._locks[name] = (lock, users - 1)
+
+
+class DatabaseLocks(MemoryLocks):
+    """
+    Same-process runs queue on the in-memory lock first; the holder then
+    takes the `locks` row, polling every LOCK_POLL_INTERVAL while another
+    worker has it. An owner that dies stops renewing and its row expires
+    after LOCK_LEASE_SECONDS.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @asynccontextmanager
+    async def hold(self, name: str) -> AsyncIterator[None]:
+        async with super().hold(name):
+            started = time.monotonic()
+            while not await self._try_acquire(name):
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+            metrics.observe("locks.wait_seconds", time.monotonic() - started)
+            renew = asyncio.create_task(self._renew(name))
+            try:
+                yield
+            finally:
+                renew.cancel()
+                with anyio.CancelScope(shield=True):
+                    async with AsyncSessionLocal() as db:
+                        await db.execute(delete(Lock).where(Lock.name == name, Lock.owner == self.owner))
+                        await db.commit()
+
+    async def _try_acquire(self, name: str) -> bool:
+        now = _now()
+        expires_at = now + timedelta(seconds=LOCK_LEASE_SECONDS)
+        async with AsyncSessionLocal() as db:
+            taken = await db.execute(
+                update(Lock).where(Lock.name == name, Lock.expires_at < now)
+                .values(owner=self.owner, expires_at=expires_at)
+            )
+            if taken.rowcount:
+                await db.commit()
+                return True
+            db.add(Lock(name=name, owner=self.owner, expires_at=expires_at))
+            try:
+                await db.commit()
+            except IntegrityError:
+                return False
+        return True
+
+    async def _renew(self, name: str) -> None:
+        while True:
+            await asyncio.sleep(LOCK_LEASE_SECONDS / 3)
+            async with AsyncSessionLocal() as db:
+                renewed = await db.execute(
+                    update(Lock).where(Lock.name == name, Lock.owner == self.owner)
+                    .values(expires_at=_now() + timedelta(seconds=LOCK_LEASE_SECONDS))
+                )
+                await db.commit()
+            if not renewed.rowcount:
+                logger.warning("lost lock %s", name)
+                return
+
+
+class SingleFlight:
+    """In-flight runs of this process by key, each holding its lock from `locks`."""
+
+    def __init__(self, locks: MemoryLocks):
+        self.locks = locks
+        self._flights: dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]], lock: Optional[str] = None) -> T:
+        """Run `fn` under `lock`, or join the run already in flight for `key`."""
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(fn, lock or key))
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._landed(key, done))
+            metrics.incr("singleflight.runs")
+        else:
+            metrics.incr("singleflight.coalesced")
+        # Shielded: a caller going away must not cancel the run the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _run(self, fn: Callable[[], Awaitable[T]], lock: str) -> T:
+        async with self.locks.hold(lock):
+            return await fn()
+
+    def _landed(self, key: str, task: asyncio.Task) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()  # mark it retrieved: every caller may have gone away
+
+
+BACKENDS = {"memory": MemoryLocks, "database": DatabaseLocks}
+
+if LOCKS_BACKEND not in BACKENDS:
+    raise ValueError(f"Unknown LOCKS_BACKEND {LOCKS_BACKEND!r}. Must be one of: {', '.join(BACKENDS)}")
+
+flights = SingleFlight(BACKENDS[LOCKS_BACKEND]())
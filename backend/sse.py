@@ -0,0 +1,18 @@
+"""Server-Sent Events framing shared by the streaming routes."""
+import json
+from typing import Any, Optional
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+# Headers for every text/event-stream response; X-Accel-Buffering stops nginx from holding frames back
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """One `event:` frame with a compact JSON payload (and an `id:` line when given)."""
+    payload = data.model_dump_json() if isinstance(data, BaseModel) else json.dumps(
+        jsonable_encoder(data), separators=(",", ":")
+    )
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {payload}\n\n"
@@ -0,0 +1,168 @@
+"""
+Incremental parser for a JSON object that arrives a few characters at a time.
+
+The Research agent answers with `{"answer": "...", "references": [{...}, ...]}`
+(see routers/chat.py::ResearchAgentResult). While the response streams, we
+want the `answer` text as it is written and each reference as soon as its
+object closes — long before the whole document is valid JSON:
+
+    parser = IncrementalObjectParser(text_field="answer", items_field="references")
+    for chunk in chunks:
+        for kind, value in parser.feed(chunk):
+            ...  # ("text", "partial answer") or ("item", {"title": ..., "url": ...})
+
+Models sometimes wrap the object in a ```json fence, or skip JSON entirely;
+in the latter case everything fed is reported as text.
+"""
+import json
+from typing import Any, Literal, Union
+
+ParsedEvent = tuple[Literal["text", "item"], Union[str, dict[str, Any]]]
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class IncrementalObjectParser:
+    def __init__(self, text_field: str, items_field: str):
+        self.text_field = text_field
+        self.items_field = items_field
+        self._mode: Literal["undecided", "fence", "json", "plain"] = "undecided"
+        self._stack: list[str] = []        # open containers, "{" or "["
+        self._in_string = False
+        self._escape = False
+        self._unicode = ""                 # hex digits of a pending \uXXXX escape
+        self._high_surrogate = ""
+        self._expect_key = False           # next top-level string is a key
+        self._key_chars: list[str] = []
+        self._key = ""                     # current top-level key
+        self._streaming_text = False       # inside the top-level text_field string
+        self._item_chars: list[str] = []   # raw text of the items_field object being read
+        self._text: list[str] = []         # whole decoded text_field so far
+        self.items: list[dict[str, Any]] = []
+
+    @property
+    def text(self) -> str:
+        """Everything decoded from `text_field` so far."""
+        return "".join(self._text)
+
+    def feed(self, chunk: str) -> list[ParsedEvent]:
+        events: list[ParsedEvent] = []
+        text_out: list[str] = []
+        for ch in chunk:
+            if self._mode in ("undecided", "fence"):
+                if ch == "{":
+                    self._mode = "json"
+                elif self._mode == "undecided" and ch == "`":
+                    self._mode = "fence"
+                    continue
+                elif self._mode == "fence" or ch.isspace():
+                    continue
+                else:
+                    self._mode = "plain"
+            if self._mode == "plain":
+                text_out.append(ch)
+                continue
+            self._consume(ch, text_out, events)
+        if text_out:
+            text = "".join(text_out)
+            self._text.append(text)
+            events.insert(0, ("text", text))
+        return events
+
+    # ── Scanner ───────────────────────────────────────────────────────────────
+
+    def _consume(self, ch: str, text_out: list[str], events: list[ParsedEvent]) -> None:
+        in_item = bool(self._item_chars)
+        if in_item:
+            self._item_chars.append(ch)
+
+        if self._in_string:
+            if self._streaming_text:
+                self._decode_text_char(ch, text_out)
+            elif self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._collecting_key():
+                    self._key = "".join(self._key_chars)
+            elif self._collecting_key():
+                self._key_chars.append(ch)
+            return
+
+        depth = len(self._stack)
+        if ch == '"':
+            self._in_string = True
+            if self._collecting_key():
+                self._key_chars = []
+            elif depth == 1 and self._key == self.text_field:
+                self._streaming_text = True
+            return
+        if ch in "{[":
+            if ch == "{" and depth == 2 and self._key == self.items_field and self._stack[-1] == "[":
+                self._item_chars = ["{"]
+            self._stack.append(ch)
+            if depth == 0:
+                self._expect_key = True
+            return
+        if ch in "}]":
+            if self._stack:
+                self._stack.pop()
+            if ch == "}" and in_item and len(self._stack) == 2:
+                self._finish_item(events)
+            return
+        if depth == 1:
+            if ch == ":":
+                self._expect_key = False
+            elif ch == ",":
+                self._expect_key = True
+
+    def _collecting_key(self) -> bool:
+        return len(self._stack) == 1 and self._expect_key
+
+    def _finish_item(self, events: list[ParsedEvent]) -> None:
+        raw = "".join(self._item_chars)
+        self._item_chars = []
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError:
+            return
+        if isinstance(item, dict):
+            self.items.append(item)
+            events.append(("item", item))
+
+    def _decode_text_char(self, ch: str, out: list[str]) -> None:
+        """Decode one character of the streamed string value, resolving escapes."""
+        if self._unicode or (self._escape and ch == "u"):
+            if self._escape:
+                self._escape = False
+                self._unicode = "u"
+                return
+            self._unicode += ch
+            if len(self._unicode) < 5:
+                return
+            code = int(self._unicode[1:], 16)
+            self._unicode = ""
+            if 0xD800 <= code <= 0xDBFF:
+                self._high_surrogate = chr(code)
+                return
+            if 0xDC00 <= code <= 0xDFFF and self._high_surrogate:
+                pair = (self._high_surrogate + chr(code)).encode("utf-16", "surrogatepass").decode("utf-16")
+                self._high_surrogate = ""
+                out.append(pair)
+                return
+            out.append(chr(code))
+            return
+        if self._escape:
+            self._escape = False
+            out.append(_ESCAPES.get(ch, ch))
+            return
+        if ch == "\\":
+            self._escape = True
+            return
+        if ch == '"':
+            self._in_string = False
+            self._streaming_text = False
+            return
+        out.append(ch)
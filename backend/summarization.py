@@ -0,0 +1,181 @@
+"""
+Map-reduce summarization for transcripts too long for one summary prompt.
+
+When an agent's transcript (or the new turns since its last summary) is
+over SUMMARY_CHUNK_TOKENS, it is split into consecutive token-bounded
+chunks and each chunk is condensed into notes — concurrently, at most
+SUMMARY_MAP_CONCURRENCY calls at a time. The notes then take the place of
+the transcript in prompt.build_summary_prompt (the reduce step), which
+still returns the usual summary / problem_statment / assumptions /
+detail_summary JSON.
+
+Chunks are cut greedily from the oldest turn, so appending turns leaves
+every chunk but the last unchanged. Notes are cached per chunk
+(SummaryChunk, keyed by seq range and checked against a digest of the
+text), so a re-run only pays for the changed tail.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Optional, Sequence
+
+from openai import AsyncOpenAI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from context_budget import MESSAGE_OVERHEAD_TOKENS, count_tokens
+from llm import record_usage
+from llm_scheduler import estimate_tokens, scheduler
+from metrics import metrics
+from models import ChatMessage, SummaryChunk
+from prompt import base_prompt, build_chunk_notes_prompt, build_notes_merge_prompt
+
+logger = logging.getLogger("dossier.summarization")
+
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "24000"))
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+
+
+def _turn_text(msg: ChatMessage) -> str:
+    return f"[{msg.role.upper()}] {msg.content}"
+
+
+def chunk_history(history: Sequence[ChatMessage], max_tokens: int) -> list[list[ChatMessage]]:
+    """Consecutive chunks of at most `max_tokens` (a single longer turn gets a chunk of its own)."""
+    chunks: list[list[ChatMessage]] = []
+    current: list[ChatMessage] = []
+    used = 0
+    for msg in history:
+        size = MESSAGE_OVERHEAD_TOKENS + count_tokens(msg.content)
+        if current and used + size > max_tokens:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(msg)
+        used += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def _complete(client: AsyncOpenAI, project_id: str, prompt: str, semaphore: asyncio.Semaphore) -> str:
+    messages = [
+        {"role": "system", "content": base_prompt.strip()},
+        {"role": "user", "content": prompt},
+    ]
+    async with semaphore:
+        response = await scheduler.call(
+            project_id, estimate_tokens(messages, 1500),
+            client.chat.completions.create,
+            model="gpt-5.2",
+            messages=messages,
+            max_completion_tokens=1500,
+            temperature=0.3,
+        )
+    record_usage("summary_chunk", response.usage)
+    return (response.choices[0].message.content or "").strip()
+
+
+async def _merge_notes(
+    client: AsyncOpenAI, project_id: str, agent: str, notes: list[str], semaphore: asyncio.Semaphore,
+) -> list[str]:
+    """Condense runs of adjacent notes until they fit one reduce prompt. Not cached."""
+    while len(notes) > 1 and sum(count_tokens(n) for n in notes) > SUMMARY_CHUNK_TOKENS:
+        groups: list[list[str]] = [[]]
+        used = 0
+        for n in notes:
+            size = count_tokens(n)
+            if groups[-1] and used + size > SUMMARY_CHUNK_TOKENS:
+                groups.append([])
+                used = 0
+            groups[-1].append(n)
+            used += size
+        if len(groups) == len(notes):  # every note fills a group on its own; nothing left to merge
+            break
+        merging = [i for i, group in enumerate(groups) if len(group) > 1]
+        merged = await asyncio.gather(
+            *(_complete(client, project_id, build_notes_merge_prompt(agent, groups[i]), semaphore) for i in merging)
+        )
+        for i, text in zip(merging, merged):
+            groups[i] = [text]
+        notes = [group[0] for group in groups]
+        metrics.incr("summary.merge_rounds")
+    return notes
+
+
+async def summarize_in_chunks(
+    db: AsyncSession,
+    client: AsyncOpenAI,
+    project_id: str,
+    agent: str,
+    history: Sequence[ChatMessage],
+) -> Optional[list[str]]:
+    """
+    Notes on consecutive chunks of `history` (oldest first), or None when it
+    fits one summary prompt. New chunk notes are committed before returning —
+    also when another chunk's call failed, so a retry starts from them.
+    """
+    agent_key = (agent or "").lower()
+    total = sum(MESSAGE_OVERHEAD_TOKENS + count_tokens(m.content) for m in history)
+    if total <= SUMMARY_CHUNK_TOKENS:
+        return None
+
+    chunks = chunk_history(history, SUMMARY_CHUNK_TOKENS)
+    texts = ["\n".join(_turn_text(m) for m in chunk) for chunk in chunks]
+    digests = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+
+    cached = {
+        (row.first_seq, row.last_seq): row
+        for row in await db.scalars(
+            select(SummaryChunk).where(
+                SummaryChunk.project_id == project_id,
+                SummaryChunk.agent == agent_key,
+                SummaryChunk.first_seq >= chunks[0][0].seq,
+            )
+        )
+    }
+
+    semaphore = asyncio.Semaphore(max(1, SUMMARY_MAP_CONCURRENCY))
+    notes: list[Optional[str]] = [None] * len(chunks)
+    pending: list[int] = []
+    for i, chunk in enumerate(chunks):
+        row = cached.get((chunk[0].seq, chunk[-1].seq))
+        if row is not None and row.digest == digests[i]:
+            notes[i] = row.notes
+        else:
+            pending.append(i)
+
+    results = await asyncio.gather(
+        *(_complete(client, project_id, build_chunk_notes_prompt(agent_key, texts[i], i + 1, len(chunks)), semaphore) for i in pending),
+        return_exceptions=True,
+    )
+    metrics.incr("summary.chunks", len(chunks))
+    metrics.incr("summary.chunk_cache_hits", len(chunks) - len(pending))
+
+    # Store the new notes, replacing any row for the same first turn (it covered an older tail)
+    error: Optional[BaseException] = None
+    for i, result in zip(pending, results):
+        if isinstance(result, BaseException):
+            error = error or result
+            continue
+        notes[i] = result
+        key = (chunks[i][0].seq, chunks[i][-1].seq)
+        row = cached.get(key)
+        for stale_key, stale in cached.items():
+            if stale_key[0] == key[0] and stale_key != key:
+                await db.delete(stale)
+        if row is None:
+            row = SummaryChunk(project_id=project_id, agent=agent_key, first_seq=key[0], last_seq=key[1])
+            db.add(row)
+        row.digest = digests[i]
+        row.notes = result
+    if pending:
+        await db.commit()
+    if error is not None:
+        raise error
+
+    logger.info(
+        "summarized agent=%s in %d chunks (%d cached, %d tokens)",
+        agent_key, len(chunks), len(chunks) - len(pending), total,
+    )
+    return await _merge_notes(client, project_id, agent_key, notes, semaphore)
@@ -0,0 +1,55 @@
+"""
+Standalone job worker: runs queued LLM jobs (see jobs.py) outside the web
+process. Start as many as you like — they share the jobs table. Set
+JOB_WORKERS=0 on the web process to leave all jobs to them.
+
+    python worker.py [--concurrency 4]
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import asyncio
+import logging
+import os
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(name)s] %(levelname)s: %(message)s",
+    datefmt="%H:%M:%S",
+)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("openai").setLevel(logging.WARNING)
+
+from database import async_engine
+from jobs import JobWorker
+from llm import build_openai_client
+import routers.chat  # noqa: F401 — registers the chat and summary job handlers
+
+
+async def run(concurrency: int) -> None:
+    client = build_openai_client()
+    if client is None:
+        raise SystemExit("OPENAI_API_KEY is not set.")
+    worker = JobWorker(client, concurrency)
+    worker.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await worker.stop()
+        await client.close()
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run background job workers against the shared jobs table.")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("JOB_WORKER_CONCURRENCY", "4")))
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.concurrency))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
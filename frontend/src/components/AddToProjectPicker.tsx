@@ -24,32 +24,16 @@ export default function AddToProjectPicker({ imageSrc, imageFilename, onClose }:
   useEffect(() => {
     const assetKey = `asset:${imageSrc}`
 
-    fetch('/api/projects?archived=false')
-      .then((r) => r.json())
-      .then((data) => {
-        setProjects(
-          data.map((p: { id: string; title: string; thumbnail_index: number }) => ({
-            ...p,
-            element_count: 0,
-          }))
-        )
-        // Fetch each project's board items: count them AND check if this image is already there
-        data.forEach((p: { id: string }) => {
-          fetch(`/api/projects/${p.id}/dossi-board`)
-            .then((r) => r.json())
-            .then((items: { file_path: string }[]) => {
-              const alreadyAdded = items.some((item) => item.file_path === assetKey)
-              if (alreadyAdded) {
-                setAdded((prev) => new Set(prev).add(p.id))
-              }
-              setProjects((prev) =>
-                prev.map((proj) =>
-                  proj.id === p.id ? { ...proj, element_count: items.length } : proj
-                )
-              )
-            })
-            .catch(() => {})
-        })
+    // Two requests total: projects with board counts, and which projects already hold this asset
+    Promise.all([
+      fetch('/api/projects?archived=false&with_counts=true').then((r) => r.json() as Promise<Project[]>),
+      fetch(`/api/dossi-board/membership?file_path=${encodeURIComponent(assetKey)}`).then(
+        (r) => r.json() as Promise<{ file_path: Record<string, string[]> }>
+      ),
+    ])
+      .then(([data, membership]) => {
+        setProjects(data.map((p) => ({ ...p, element_count: p.element_count ?? 0 })))
+        setAdded(new Set(membership.file_path[assetKey] ?? []))
       })
       .catch(() => {})
   }, [imageSrc])
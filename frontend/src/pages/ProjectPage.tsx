@@ -6,6 +6,7 @@ import DossiBoard, { DossiBoardHandle } from '../components/DossiBoard'
 import DossiBoardPreview from '../components/DossiBoardPreview'
 import StrategistIdle from '../components/StrategistIdle'
 import ResearcherIdle from '../components/ResearcherIdle'
+import { readEventStream } from '../utils/sse'
 import styles from './ProjectPage.module.css'
 
 interface Project {
@@ -42,11 +43,14 @@ interface Citation {
 
 interface ChatMessage {
   id?: string
+  seq?: number
   role: 'user' | 'assistant'
   content: string
   created_at?: string
   image_url?: string
   image_src?: string  // client-only alias; populated from image_url on load
+  status?: 'pending' | 'complete' | 'failed'  // user turns: 'failed' when the model call failed (see `error`)
+  error?: string | null
   citations?: Citation[]  // web search sources (Research agent); only on newly received messages
   web_search_used?: boolean  // true when this reply used the web-search model
   bodyContent?: string  // content with the References block stripped out
@@ -79,6 +83,21 @@ function parseReferencesFromContent(content: string): { body: string; citations:
 
 type AgentKey = 'strategy' | 'research' | 'concept' | 'present'
 
+interface StreamDone {
+  user_message: ChatMessage
+  assistant_message: ChatMessage
+  citations?: Citation[] | null
+  web_search_used: boolean
+  complete: boolean
+}
+
+interface ProjectBootstrap {
+  project: Project
+  messages: Record<AgentKey, (ChatMessage & { seq: number })[]>
+  has_more_messages: Record<AgentKey, boolean>
+  websites: { source_url: string | null }[]
+}
+
 const TABS = ['Strategist', 'Researcher', 'Director', 'Presenter'] as const
 const TAB_KEYS: AgentKey[] = ['strategy', 'research', 'concept', 'present']
 const CLARITY_DOTS = 8
@@ -233,8 +252,16 @@ export default function ProjectPage() {
   const [savedBoardUrls, setSavedBoardUrls] = useState<Set<string>>(new Set())
   const [input, setInput] = useState('')
   const [chatLoading, setChatLoading] = useState(false)
+  const [replyStreaming, setReplyStreaming] = useState(false)
   const [droppedImage, setDroppedImage] = useState<{ src: string; name: string } | null>(null)
   const [chatInputDragOver, setChatInputDragOver] = useState(false)
+  // Project version the bootstrap reflected; the live event stream resumes from it
+  const [streamSince, setStreamSince] = useState<number | null>(null)
+  // Bumped when the event stream can't replay what was missed; reloads the project from scratch
+  const [reloadCount, setReloadCount] = useState(0)
+  // Agent whose send is in flight — its messages arrive via the POST response, not the event stream
+  const sendingAgentRef = useRef<AgentKey | null>(null)
+  const activeTabRef = useRef(0)
   const chatEndRef = useRef<HTMLDivElement>(null)
   const chatInputRef = useRef<HTMLTextAreaElement>(null)
   const titleSaveTimeoutRef = useRef<ReturnType<typeof setTimeout> | null>(null)
@@ -271,16 +298,18 @@ export default function ProjectPage() {
     setLocalAssumptions(assumptionsByAgent[currentAgent])
   }, [activeTab, summaryByAgent, problemByAgent, assumptionsByAgent])
 
-  // Load project + per-agent chat history in parallel
+  // Load project, recent per-agent chat history and saved board URLs in one request
   useEffect(() => {
     if (!id) return
 
-    fetch(`/api/projects/${id}`)
+    fetch(`/api/projects/${id}/bootstrap`)
       .then((r) => {
         if (!r.ok) throw new Error('Not found')
-        return r.json() as Promise<Project>
+        const version = Number(r.headers.get('ETag')?.match(/v(\d+)/)?.[1])
+        if (!Number.isNaN(version)) setStreamSince(version)
+        return r.json() as Promise<ProjectBootstrap>
       })
-      .then(async (projectData) => {
+      .then(({ project: projectData, messages, has_more_messages, websites }) => {
         setProject(projectData)
         setTitle(projectData.title === 'Untitled' ? '' : projectData.title)
 
@@ -304,24 +333,9 @@ export default function ProjectPage() {
           present: projectData.present_assumptions ?? '',
         })
 
-        // Load per-agent chat history + saved board URLs in parallel
-        const agents: AgentKey[] = ['strategy', 'research', 'concept', 'present']
-        const [histories, boardItems] = await Promise.all([
-          Promise.all(
-            agents.map((agent) =>
-              fetch(`/api/projects/${id}/messages?agent=${agent}`).then((r) =>
-                r.ok ? (r.json() as Promise<ChatMessage[]>) : []
-              )
-            )
-          ),
-          fetch(`/api/projects/${id}/dossi-board?folder=websites`).then((r) =>
-            r.ok ? (r.json() as Promise<{ source_url: string | null }[]>) : []
-          ),
-        ])
-
         // Build the set of already-saved URLs
         const savedUrls = new Set<string>(
-          boardItems.flatMap((item) => (item.source_url ? [item.source_url] : []))
+          websites.flatMap((item) => (item.source_url ? [item.source_url] : []))
         )
         setSavedBoardUrls(savedUrls)
 
@@ -335,15 +349,74 @@ export default function ProjectPage() {
             return base
           })
 
+        const agents: AgentKey[] = ['strategy', 'research', 'concept', 'present']
         setMessagesByAgent({
-          strategy: hydrate(histories[0] ?? [], 'strategy'),
-          research: hydrate(histories[1] ?? [], 'research'),
-          concept: hydrate(histories[2] ?? [], 'concept'),
-          present: hydrate(histories[3] ?? [], 'present'),
+          strategy: hydrate(messages.strategy ?? [], 'strategy'),
+          research: hydrate(messages.research ?? [], 'research'),
+          concept: hydrate(messages.concept ?? [], 'concept'),
+          present: hydrate(messages.present ?? [], 'present'),
         })
+
+        // Long histories: fetch the older turns behind the first page and prepend them
+        agents
+          .filter((agent) => has_more_messages[agent] && (messages[agent] ?? []).length > 0)
+          .forEach((agent) => {
+            fetch(`/api/projects/${id}/messages?agent=${agent}&before=${messages[agent][0].seq}`)
+              .then((r) => (r.ok ? (r.json() as Promise<ChatMessage[]>) : []))
+              .then((older) =>
+                setMessagesByAgent((prev) => ({ ...prev, [agent]: [...hydrate(older, agent), ...prev[agent]] }))
+              )
+              .catch(() => {})
+          })
       })
       .catch(() => navigate('/'))
-  }, [id, navigate])
+  }, [id, navigate, reloadCount])
+
+  useEffect(() => {
+    activeTabRef.current = activeTab
+  }, [activeTab])
+
+  // Live updates: messages, summaries and saved websites written by other tabs
+  useEffect(() => {
+    if (!id || streamSince === null) return
+    const source = new EventSource(`/api/projects/${id}/events?since=${streamSince}`)
+
+    source.addEventListener('message', (e) => {
+      const { agent, message } = JSON.parse(e.data) as { agent: AgentKey; message: ChatMessage }
+      if (!TAB_KEYS.includes(agent) || sendingAgentRef.current === agent) return
+      const incoming: ChatMessage = { ...message, image_src: message.image_url ?? undefined }
+      if (agent === 'research' && message.role === 'assistant') {
+        const { body, citations } = parseReferencesFromContent(message.content)
+        incoming.bodyContent = body
+        if (citations.length > 0) incoming.citations = citations
+      }
+      setMessagesByAgent((prev) =>
+        prev[agent].some((m) => m.id === message.id) ? prev : { ...prev, [agent]: [...prev[agent], incoming] }
+      )
+    })
+    source.addEventListener('summary', (e) => {
+      const { agent, summary } = JSON.parse(e.data) as {
+        agent: AgentKey
+        summary: { summary: string | null; problem_statement: string | null; assumptions: string | null }
+      }
+      // Don't overwrite fields the user may be typing into
+      if (!TAB_KEYS.includes(agent) || TAB_KEYS[activeTabRef.current] === agent) return
+      setSummaryByAgent((prev) => ({ ...prev, [agent]: summary.summary ?? '' }))
+      setProblemByAgent((prev) => ({ ...prev, [agent]: summary.problem_statement ?? '' }))
+      setAssumptionsByAgent((prev) => ({ ...prev, [agent]: summary.assumptions ?? '' }))
+    })
+    // Behind the server's change-log retention (e.g. after a long sleep): start over from /bootstrap
+    source.addEventListener('reset', () => {
+      source.close()
+      setReloadCount((n) => n + 1)
+    })
+    source.addEventListener('board_item', (e) => {
+      const item = JSON.parse(e.data) as { source_url: string | null }
+      if (item.source_url) setSavedBoardUrls((prev) => new Set([...prev, item.source_url as string]))
+    })
+
+    return () => source.close()
+  }, [id, streamSince])
 
   // Open Dossi Board when navigating from sidebar "Visual Exploration" project list
   useEffect(() => {
@@ -539,9 +612,11 @@ export default function ProjectPage() {
     setInput('')
     setDroppedImage(null)
     setChatLoading(true)
+    sendingAgentRef.current = agent
+    let streaming = false
 
     try {
-      const res = await fetch(`/api/projects/${id}/messages`, {
+      const res = await fetch(`/api/projects/${id}/messages/stream`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -550,10 +625,38 @@ export default function ProjectPage() {
           ...(imageBase64 ? { image_url: imageBase64 } : {}),
         }),
       })
-      if (!res.ok) throw new Error('Chat failed')
-      const data = await res.json()
-      // Replace the optimistic user message with the persisted one, then add assistant reply (with citations if any)
-      const assistantMsg: ChatMessage = { ...data.assistant_message, citations: data.citations ?? undefined, web_search_used: data.web_search_used }
+      if (!res.ok || !res.body) throw new Error('Chat failed')
+
+      let data: StreamDone | null = null
+      for await (const { event, data: payload } of readEventStream(res.body)) {
+        if (event === 'delta') {
+          const { text: delta } = JSON.parse(payload) as { text: string }
+          if (!streaming) {
+            // First tokens: swap the loading indicator for an assistant bubble that fills in as the reply streams
+            streaming = true
+            setReplyStreaming(true)
+            setMessagesByAgent((prev) => ({
+              ...prev,
+              [agent]: [...prev[agent], { role: 'assistant' as const, content: delta }],
+            }))
+            continue
+          }
+          setMessagesByAgent((prev) => {
+            const msgs = prev[agent]
+            const last = msgs[msgs.length - 1]
+            return { ...prev, [agent]: [...msgs.slice(0, -1), { ...last, content: last.content + delta }] }
+          })
+        } else if (event === 'done') {
+          data = JSON.parse(payload) as StreamDone
+        } else if (event === 'error') {
+          throw new Error('Chat failed')
+        }
+      }
+      if (!data) throw new Error('Chat failed')
+      const done = data
+
+      // Replace the optimistic user message and streamed bubble with the persisted ones (with citations if any)
+      const assistantMsg: ChatMessage = { ...done.assistant_message, citations: done.citations ?? undefined, web_search_used: done.web_search_used }
       if (agent === 'research' && assistantMsg.role === 'assistant') {
         const { body } = parseReferencesFromContent(assistantMsg.content)
         assistantMsg.bodyContent = body
@@ -561,8 +664,8 @@ export default function ProjectPage() {
       setMessagesByAgent((prev) => ({
         ...prev,
         [agent]: [
-          ...prev[agent].slice(0, -1),
-          { ...data.user_message, image_src: data.user_message.image_url ?? undefined },
+          ...prev[agent].slice(0, -2),
+          { ...done.user_message, image_src: done.user_message.image_url ?? undefined },
           assistantMsg,
         ],
       }))
@@ -570,11 +673,14 @@ export default function ProjectPage() {
       setMessagesByAgent((prev) => ({
         ...prev,
         [agent]: [
-          ...prev[agent],
+          // Drop the half-streamed bubble; the server keeps only the user message, marked failed
+          ...(streaming ? prev[agent].slice(0, -1) : prev[agent]),
           { role: 'assistant' as const, content: 'Sorry, something went wrong. Please try again.' },
         ],
       }))
     } finally {
+      sendingAgentRef.current = null
+      setReplyStreaming(false)
       setChatLoading(false)
     }
   }
@@ -848,10 +954,13 @@ export default function ProjectPage() {
                       )}
                     </div>
                   )}
+                  {msg.role === 'user' && msg.status === 'failed' && (
+                    <div className={styles.chatMessageFailed} title={msg.error ?? undefined}>Not answered</div>
+                  )}
                 </div>
               </div>
             ))}
-            {chatLoading && (
+            {chatLoading && !replyStreaming && (
               <div className={`${styles.chatBubble} ${styles.chatBubbleAssistant} ${styles.chatLoading}`}>
                 <svg className={styles.chatLoadingSvg} viewBox="0 0 1080 1080" xmlns="http://www.w3.org/2000/svg" aria-hidden="true">
                   <polygon fill="var(--accent, #93ccff)" points="7.52 17.08 715.2 17.08 1069.04 555.88 361.36 1062.51 715.2 1062.51 7.52 17.08"/>